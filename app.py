@@ -4,14 +4,22 @@ Interactive comparison of Basic vs Enhanced (Ontology + KG) approaches
 """
 import streamlit as st
 import os
+import hashlib
+import threading
+import time
+from functools import lru_cache
+from itertools import islice
 from dotenv import load_dotenv
-from llm_analyzer import BasicAnalyzer, EnhancedAnalyzer, compare_approaches
-import json
+from llm_analyzer import AnalyzerPair
+import altair as alt
+import orjson
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
-# Load environment variables
-load_dotenv()
-
 # Page configuration
 st.set_page_config(
     page_title="Ontology & Knowledge Graph Demo",
@@ -20,8 +28,16 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS
-st.markdown("""
+@st.cache_resource(show_spinner=False)
+def load_environment():
+    """Load .env once per process rather than on every script rerun"""
+    return load_dotenv(override=False)
+
+# Load environment variables
+load_environment()
+
+# Custom CSS (rendered with st.html in main, which skips markdown parsing)
+CUSTOM_CSS = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -50,57 +66,343 @@ st.markdown("""
         background-color: #d1ecf1;
         border-left: 5px solid #17a2b8;
     }
-    .metadata-badge {
-        display: inline-block;
-        padding: 0.3rem 0.6rem;
-        margin: 0.2rem;
-        border-radius: 5px;
-        font-size: 0.85rem;
-        background-color: #e9ecef;
+    .metric-row {
+        display: flex;
+        gap: 1rem;
     }
-    .comparison-box {
-        background-color: #f8f9fa;
-        padding: 1rem;
-        border-radius: 5px;
-        margin: 1rem 0;
+    .metric-card {
+        flex: 1;
+    }
+    .metric-label {
+        font-size: 0.875rem;
+    }
+    .metric-value {
+        font-size: 2.25rem;
+        line-height: 1.4;
+    }
+    .metric-delta {
+        font-size: 0.875rem;
+        color: #09ab3b;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-def load_chat_history():
-    """Load chat history from file"""
-    history_file = Path("data/chat_history.json")
-    if history_file.exists():
-        try:
-            with open(history_file, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error loading chat history: {e}")
-    return []
+# Static "Key Differences" cards, rendered in one st.html call instead of three st.metric widgets
+KEY_DIFFERENCES = [
+    ("Data Understanding", "Enhanced", "Semantic vs Tabular"),
+    ("Relationship Awareness", "Enhanced", "Graph vs Flat"),
+    ("Insight Depth", "Enhanced", "Contextual vs Surface"),
+]
+
+KEY_DIFFERENCES_HTML = '<div class="metric-row">' + "".join(
+    f'<div class="metric-card">'
+    f'<div class="metric-label">{label}</div>'
+    f'<div class="metric-value">{value}</div>'
+    f'<div class="metric-delta">↑ {delta}</div>'
+    f'</div>'
+    for label, value, delta in KEY_DIFFERENCES
+) + '</div>'
+
+# The data loaders below use st.cache_resource instead of st.cache_data.
+# cache_data returns a fresh unpickled copy on every cache hit, while
+# cache_resource hands back the cached object itself. Callers must treat
+# the returned DataFrames, Series and dicts as read-only.
+
+def file_mtime(path):
+    """Modification time of a data file, used to key the file caches"""
+    return Path(path).stat().st_mtime
+
+SALES_DATA_FILE = "data/sales_data.parquet"
+
+SALES_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+SALES_COLUMN_TYPES = {
+    'date': pa.timestamp('s'),
+    'status': SALES_CATEGORY,
+    'customer_region': SALES_CATEGORY,
+    'customer_type': SALES_CATEGORY,
+    'customer_name': SALES_CATEGORY,
+    'product_name': SALES_CATEGORY,
+    'sales_rep_name': SALES_CATEGORY,
+    'quantity': pa.int32(),
+    'net_revenue': pa.float32(),
+    'discount_percentage': pa.float32()
+}
+
+@st.cache_resource
+def load_sales_df(path, mtime):
+    """Load sales Parquet file (cached until the file changes)"""
+    # Cast in Arrow; dictionary columns become pandas categoricals
+    table = pq.read_table(path)
+    for name, dtype in SALES_COLUMN_TYPES.items():
+        table = table.set_column(table.schema.get_field_index(name), name, table[name].cast(dtype))
+    return table.to_pandas()
+
+@st.cache_resource
+def load_metadata(path, mtime):
+    """Load metadata JSON (cached until the file changes)"""
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
+@st.cache_resource
+def metadata_frames(path, mtime):
+    """Build reference DataFrames and their chart series from metadata"""
+    metadata = load_metadata(path, mtime)
+    customers_df = pd.DataFrame(metadata['customers'])
+    products_df = pd.DataFrame(metadata['products'])
+    reps_df = pd.DataFrame(metadata['sales_reps'])
+    
+    return {
+        'customers': customers_df,
+        'products': products_df,
+        'sales_reps': reps_df,
+        'customers_type_counts': customers_df['type'].value_counts(),
+        'customers_region_counts': customers_df['region'].value_counts(),
+        'products_cat_counts': products_df['category'].value_counts(),
+        'products_price_series': products_df.set_index('name')['price'],
+        'reps_experience_series': reps_df.set_index('name')['experience_years'],
+        'reps_region_counts': reps_df['region'].value_counts()
+    }
+
+@st.cache_resource
+def load_ttl_preview(path, mtime, n=50):
+    """Return the first n lines of a Turtle file and its total line count"""
+    # Only the preview lines are decoded; the count streams raw bytes
+    with open(path, 'r', encoding='utf-8') as f:
+        head = list(islice(f, n))
+    with open(path, 'rb') as f:
+        total_lines = sum(1 for _ in f)
+    
+    preview = ''.join(head)
+    if total_lines > n:
+        preview += f"\n... ({total_lines - n} more lines)"
+    return preview, total_lines
+
+def series_to_arrow(series):
+    """Convert an aggregated Series to a two-column Arrow table for charting"""
+    frame = series.reset_index()
+    key = frame.columns[0]
+    if isinstance(frame[key].dtype, pd.CategoricalDtype):
+        frame[key] = frame[key].astype(str)
+    return pa.Table.from_pandas(frame, preserve_index=False)
+
+@st.cache_resource
+def compute_sales_aggregates(data_mtime):
+    """Precompute the key metrics and chart series for the data view"""
+    df = load_sales_df(SALES_DATA_FILE, data_mtime)
+    revenue = df['net_revenue']
+    
+    return {
+        'total_sales': len(df),
+        'total_revenue': revenue.sum(),
+        'avg_deal': revenue.mean(),
+        'completed': (df['status'] == 'Completed').sum(),
+        # Chart data is converted to Arrow once instead of on every rerun
+        'region_revenue': series_to_arrow(
+            df.groupby('customer_region', observed=True)['net_revenue'].sum().sort_values(ascending=False)
+        ),
+        'type_revenue': series_to_arrow(
+            df.groupby('customer_type', observed=True)['net_revenue'].sum().sort_values(ascending=False)
+        ),
+        'product_revenue_top10': series_to_arrow(
+            df.groupby('product_name', observed=True)['net_revenue'].sum().sort_values(ascending=False).head(10)
+        ),
+        'daily_sales': series_to_arrow(revenue.groupby(df['date']).sum().sort_index())
+    }
+
+TRANSACTION_COLUMNS = [
+    'sale_id', 'date', 'customer_name', 'customer_type',
+    'product_name', 'quantity', 'net_revenue', 'discount_percentage',
+    'sales_rep_name', 'status'
+]
+
+@st.cache_resource
+def filter_sales(data_mtime, status, region, customer_type, limit=100):
+    """Filter sales transactions, returning the first rows and the match count"""
+    df = load_sales_df(SALES_DATA_FILE, data_mtime)
+    
+    mask = pd.Series(True, index=df.index)
+    if status:
+        mask &= df['status'].isin(status)
+    if region:
+        mask &= df['customer_region'].isin(region)
+    if customer_type:
+        mask &= df['customer_type'].isin(customer_type)
+    
+    return df.loc[mask, TRANSACTION_COLUMNS].head(limit), int(mask.sum())
+
+@st.cache_resource(max_entries=1)
+def get_analyzer_pair(data_mtime):
+    """Basic and enhanced analyzers shared by all sessions
+    
+    No tab displays the knowledge graph itself, so none is built here: the
+    enhanced analyzer reads the insights precomputed by setup.py, and only
+    builds the graph if they are missing or older than the sales data.
+    """
+    return AnalyzerPair()
+
+ANSWER_CACHE_TTL = 3600
+
+@st.cache_resource
+def get_executor():
+    """Thread pool used to run both analyzers concurrently"""
+    return ThreadPoolExecutor(max_workers=4)
+
+@st.cache_resource
+def get_answer_cache():
+    """Process-wide cache of analysis results, keyed by normalized question"""
+    return {}
+
+@st.cache_resource
+def get_inflight_analyses():
+    """Futures for analyses still running, keyed by normalized question"""
+    return {}, threading.Lock()
+
+def normalize_question(question):
+    """Case- and whitespace-insensitive form of a question for cache lookups"""
+    return " ".join(question.lower().split())
+
+def analyze_question(question, analyzer_pair):
+    """Answer a question with both approaches, reusing recent identical answers"""
+    cache = get_answer_cache()
+    key = normalize_question(question)
+    now = time.time()
+    
+    # A repeat submission (double click, rerun, another session) while the
+    # same question is still being answered waits for that run instead of
+    # calling the LLM again. The cache is checked under the lock too, so a
+    # run finishing just before this one can't be missed and repeated.
+    inflight, lock = get_inflight_analyses()
+    with lock:
+        cached = cache.get(key)
+        if cached and now - cached[0] < ANSWER_CACHE_TTL:
+            return cached[1]
+        future = inflight.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = inflight[key] = Future()
+    if not is_owner:
+        return future.result()
+    
+    try:
+        # Both calls are independent and I/O bound, so they run concurrently
+        (basic_answer, basic_meta), (enhanced_answer, enhanced_meta) = analyzer_pair.analyze_pair(
+            question, get_executor()
+        )
+        
+        result = {
+            "basic": {"answer": basic_answer, "metadata": basic_meta},
+            "enhanced": {"answer": enhanced_answer, "metadata": enhanced_meta}
+        }
+        
+        # Failed calls report an "error" in their metadata; only keep good answers
+        if "error" not in basic_meta and "error" not in enhanced_meta:
+            with lock:
+                for stale in [k for k, (ts, _) in cache.items() if now - ts >= ANSWER_CACHE_TTL]:
+                    del cache[stale]
+                cache[key] = (now, result)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with lock:
+            inflight.pop(key, None)
+
+CHAT_HISTORY_FILE = Path("data/chat_history.jsonl")
+LEGACY_CHAT_HISTORY_FILE = Path("data/chat_history.json")
+
+CHAT_HISTORY_LIMIT = int(os.getenv("CHAT_HISTORY_LIMIT", "10"))
+# Upper bound on entries held in session state, however many are loaded
+CHAT_HISTORY_MAX = 100
+
+def load_chat_history(limit=CHAT_HISTORY_LIMIT):
+    """Load the most recent chat entries from file
+    
+    Returns the last `limit` entries and the total number stored on disk.
+    """
+    try:
+        if CHAT_HISTORY_FILE.exists():
+            total = 0
+            recent = deque(maxlen=limit)
+            with open(CHAT_HISTORY_FILE, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        recent.append(line)
+                        total += 1
+            return [orjson.loads(line) for line in recent], total
+        if LEGACY_CHAT_HISTORY_FILE.exists():
+            # Migrate the old JSON array once so later appends keep it
+            with open(LEGACY_CHAT_HISTORY_FILE, 'rb') as f:
+                history = orjson.loads(f.read())
+            save_chat_history(history)
+            return history[-limit:], len(history)
+    except Exception as e:
+        print(f"Error loading chat history: {e}")
+    return [], 0
+
+def append_chat_entry(entry):
+    """Append a single chat entry to the history file"""
+    try:
+        with open(CHAT_HISTORY_FILE, 'ab') as f:
+            f.write(orjson.dumps(entry) + b"\n")
+    except Exception as e:
+        print(f"Error saving chat history: {e}")
 
 def save_chat_history(history):
-    """Save chat history to file"""
-    history_file = Path("data/chat_history.json")
+    """Rewrite the whole history file (used to migrate the legacy file)"""
     try:
-        with open(history_file, 'w') as f:
-            json.dump(history, f, indent=2)
+        with open(CHAT_HISTORY_FILE, 'wb') as f:
+            f.write(b"".join(orjson.dumps(entry) + b"\n" for entry in history))
     except Exception as e:
         print(f"Error saving chat history: {e}")
 
+def clear_chat_history():
+    """Truncate the history file"""
+    try:
+        open(CHAT_HISTORY_FILE, 'w').close()
+    except Exception as e:
+        print(f"Error clearing chat history: {e}")
+
+def render_message_md(content):
+    """Escape dollar signs so amounts are not rendered as LaTeX"""
+    return content.replace("$", "\\$")
+
 def initialize_session_state():
     """Initialize session state variables"""
     if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = load_chat_history()
-    if 'analyzers_ready' not in st.session_state:
-        st.session_state.analyzers_ready = False
-    if 'basic_analyzer' not in st.session_state:
-        st.session_state.basic_analyzer = None
-    if 'enhanced_analyzer' not in st.session_state:
-        st.session_state.enhanced_analyzer = None
+        st.session_state.chat_history_limit = CHAT_HISTORY_LIMIT
+        st.session_state.chat_history, st.session_state.chat_history_total = load_chat_history()
+    if 'history_expanded' not in st.session_state:
+        st.session_state.history_expanded = {}
+
+def toggle_history_entry(n):
+    """Open or close a history entry (runs before the rerun renders)"""
+    expanded = st.session_state.history_expanded
+    expanded[n] = not expanded.get(n, False)
+
+def reset_chat_history():
+    """Clear the in-memory history and truncate the history file"""
+    st.session_state.chat_history = []
+    st.session_state.chat_history_total = 0
+    st.session_state.chat_history_limit = CHAT_HISTORY_LIMIT
+    st.session_state.history_expanded = {}
+    clear_chat_history()
 
+def load_earlier_history():
+    """Pull the next page of older history entries from disk"""
+    st.session_state.chat_history_limit = min(
+        st.session_state.chat_history_limit + CHAT_HISTORY_LIMIT, CHAT_HISTORY_MAX
+    )
+    st.session_state.chat_history, st.session_state.chat_history_total = load_chat_history(
+        st.session_state.chat_history_limit
+    )
+
+@st.cache_data(ttl=30, show_spinner=False)
 def check_setup():
-    """Check if data and knowledge graph are set up"""
-    data_exists = Path("data/sales_data.csv").exists()
+    """Check if data and knowledge graph are set up (re-checked every 30s)"""
+    data_exists = Path(SALES_DATA_FILE).exists()
     kg_exists = Path("data/knowledge_graph.ttl").exists()
     api_key = os.getenv("OPENAI_API_KEY")
     
@@ -175,55 +477,77 @@ def setup_sidebar():
         st.markdown("*Files powering the Enhanced approach*")
         
         data_files = {
-            "sales_data.csv": "Sales transactions",
+            "sales_data.parquet": "Sales transactions",
             "metadata.json": "Customers & Products",
             "sales_ontology.ttl": "Domain ontology",
-            "knowledge_graph.ttl": "Semantic graph"
+            "knowledge_graph.ttl": "Semantic graph",
+            "kg_insights.json": "Precomputed graph insights"
         }
         
         for filename, description in data_files.items():
             filepath = Path(f"data/{filename}")
             if filepath.exists():
-                with st.expander(f"📄 {filename}"):
-                    st.caption(description)
-                    
-                    # Show file size
-                    file_size = filepath.stat().st_size
-                    if file_size > 1024*1024:
-                        size_str = f"{file_size / (1024*1024):.2f} MB"
-                    elif file_size > 1024:
-                        size_str = f"{file_size / 1024:.2f} KB"
-                    else:
-                        size_str = f"{file_size} bytes"
-                    st.caption(f"Size: {size_str}")
-                    
-                    # Show file preview
-                    try:
-                        if filename.endswith('.json'):
-                            import json
-                            with open(filepath, 'r') as f:
-                                content = json.load(f)
-                                st.json(content)
-                        elif filename.endswith('.csv'):
-                            import pandas as pd
-                            df = pd.read_csv(filepath)
-                            st.caption(f"Rows: {len(df)} | Columns: {len(df.columns)}")
-                            st.dataframe(df.head(10), use_container_width=True)
-                        elif filename.endswith('.ttl'):
-                            with open(filepath, 'r', encoding='utf-8') as f:
-                                lines = f.readlines()
-                                # Show first 50 lines
-                                preview = ''.join(lines[:50])
-                                if len(lines) > 50:
-                                    preview += f"\n... ({len(lines) - 50} more lines)"
-                                st.code(preview, language="turtle")
-                                st.caption(f"Total lines: {len(lines)}")
-                    except Exception as e:
-                        st.error(f"Error reading file: {e}")
-
-def display_answer_comparison(question, basic_result, enhanced_result):
+                display_file_preview(filepath, description)
+
+@st.fragment
+def display_file_preview(filepath, description):
+    """Show a data file's size, loading its contents only on request"""
+    filename = filepath.name
+    with st.expander(f"📄 {filename}"):
+        st.caption(description)
+        
+        # Show file size
+        file_stat = filepath.stat()
+        file_size = file_stat.st_size
+        if file_size > 1024*1024:
+            size_str = f"{file_size / (1024*1024):.2f} MB"
+        elif file_size > 1024:
+            size_str = f"{file_size / 1024:.2f} KB"
+        else:
+            size_str = f"{file_size} bytes"
+        st.caption(f"Size: {size_str}")
+        
+        # Show file preview (reruns only this fragment when toggled)
+        if not st.toggle("Show preview", key=f"preview_{filename}"):
+            return
+        
+        try:
+            if filename.endswith('.json'):
+                st.json(load_metadata(str(filepath), file_stat.st_mtime))
+            elif filename.endswith('.parquet'):
+                df = load_sales_df(str(filepath), file_stat.st_mtime)
+                st.caption(f"Rows: {len(df)} | Columns: {len(df.columns)}")
+                st.dataframe(df.head(10), use_container_width=True)
+            elif filename.endswith('.ttl'):
+                preview, total_lines = load_ttl_preview(str(filepath), file_stat.st_mtime)
+                st.code(preview, language="turtle")
+                st.caption(f"Total lines: {total_lines}")
+        except Exception as e:
+            st.error(f"Error reading file: {e}")
+
+@lru_cache(maxsize=256)
+def question_key(question):
+    """Short, stable widget key suffix for a question"""
+    return hashlib.blake2s(question.encode(), digest_size=6).hexdigest()
+
+def display_prompt_details(label, metadata, widget_key, height):
+    """Show the prompts sent to the LLM for one approach"""
+    with st.expander(f"📋 View LLM Prompt ({label})"):
+        st.markdown("**System Prompt:**")
+        st.code(metadata.get('system_prompt', 'N/A'), language="text")
+        st.markdown("**User Prompt:**")
+        st.text_area(
+            f"User prompt ({label})", metadata.get('user_prompt', 'N/A'),
+            height=height, key=widget_key, disabled=True, label_visibility="collapsed"
+        )
+        st.caption(f"Prompt tokens: {metadata.get('prompt_tokens', 'N/A')} | "
+                   f"Completion tokens: {metadata.get('completion_tokens', 'N/A')} | Model: {metadata.get('model', 'N/A')}")
+
+def display_answer_comparison(question, basic_result, enhanced_result, key_prefix=""):
     """Display side-by-side comparison of both approaches"""
     
+    qkey = key_prefix + question_key(question)
+    
     st.markdown(f"### 🤔 Question: *{question}*")
     st.divider()
     
@@ -232,67 +556,36 @@ def display_answer_comparison(question, basic_result, enhanced_result):
     with col1:
         st.markdown("#### 🔸 Basic Approach (No Ontology)")
         st.markdown('<div class="approach-card basic-card">', unsafe_allow_html=True)
-        st.markdown(basic_result['answer'])
+        st.markdown(render_message_md(basic_result['answer']))
         st.markdown('</div>', unsafe_allow_html=True)
         
-        with st.expander("📋 View LLM Prompt (Basic)"):
-            st.markdown("**System Prompt:**")
-            st.code(basic_result['metadata'].get('system_prompt', 'N/A'), language="text")
-            st.markdown("**User Prompt:**")
-            st.text_area("", basic_result['metadata'].get('user_prompt', 'N/A'), height=300, key=f"basic_prompt_{hash(question)}", disabled=True)
-            st.caption(f"Approximate tokens: {basic_result['metadata'].get('prompt_tokens', 0)} | Model: {basic_result['metadata'].get('model', 'N/A')}")
+        display_prompt_details("Basic", basic_result['metadata'], f"basic_prompt_{qkey}", 300)
         
         with st.expander("📊 Approach Details"):
             meta = basic_result['metadata']
             for key, value in meta.items():
-                if key not in ['system_prompt', 'user_prompt', 'prompt_tokens', 'model']:
+                if key not in ['system_prompt', 'user_prompt', 'prompt_tokens', 'completion_tokens', 'model']:
                     st.markdown(f"**{key.replace('_', ' ').title()}:** {value}")
     
     with col2:
         st.markdown("#### 🔹 Enhanced Approach (Ontology + KG)")
         st.markdown('<div class="approach-card enhanced-card">', unsafe_allow_html=True)
-        st.markdown(enhanced_result['answer'])
+        st.markdown(render_message_md(enhanced_result['answer']))
         st.markdown('</div>', unsafe_allow_html=True)
         
-        with st.expander("📋 View LLM Prompt (Enhanced)"):
-            st.markdown("**System Prompt:**")
-            st.code(enhanced_result['metadata'].get('system_prompt', 'N/A'), language="text")
-            st.markdown("**User Prompt:**")
-            st.text_area("", enhanced_result['metadata'].get('user_prompt', 'N/A'), height=400, key=f"enhanced_prompt_{hash(question)}", disabled=True)
-            st.caption(f"Approximate tokens: {enhanced_result['metadata'].get('prompt_tokens', 0)} | Model: {enhanced_result['metadata'].get('model', 'N/A')}")
+        display_prompt_details("Enhanced", enhanced_result['metadata'], f"enhanced_prompt_{qkey}", 400)
         
         with st.expander("📊 Approach Details"):
             meta = enhanced_result['metadata']
             for key, value in meta.items():
-                if key not in ['system_prompt', 'user_prompt', 'prompt_tokens', 'model']:
+                if key not in ['system_prompt', 'user_prompt', 'prompt_tokens', 'completion_tokens', 'model']:
                     st.markdown(f"**{key.replace('_', ' ').title()}:** {value}")
     
     # Key differences
     st.markdown("---")
     st.markdown("### 🎯 Key Differences")
     
-    diff_col1, diff_col2, diff_col3 = st.columns(3)
-    
-    with diff_col1:
-        st.metric(
-            label="Data Understanding",
-            value="Enhanced",
-            delta="Semantic vs Tabular"
-        )
-    
-    with diff_col2:
-        st.metric(
-            label="Relationship Awareness",
-            value="Enhanced",
-            delta="Graph vs Flat"
-        )
-    
-    with diff_col3:
-        st.metric(
-            label="Insight Depth",
-            value="Enhanced",
-            delta="Contextual vs Surface"
-        )
+    st.html(KEY_DIFFERENCES_HTML)
     
     # Prompt comparison
     st.markdown("---")
@@ -341,157 +634,165 @@ PLUS all the basic stats
         to reason causally and answer "WHY" questions.
         """)
 
+def _render_transactions_tab(df, data_mtime):
+    """Sales transactions with status/region/type filters"""
+    st.markdown("#### Sales Transactions (Sample)")
+    st.markdown("*This is what the **Basic Approach** sees - flat tabular data*")
+    
+    # Filters
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        status_filter = st.multiselect("Status", df['status'].cat.categories, default=["Completed"])
+    with col2:
+        region_filter = st.multiselect("Region", df['customer_region'].cat.categories)
+    with col3:
+        customer_type_filter = st.multiselect("Customer Type", df['customer_type'].cat.categories)
+    
+    # Filter data (sorted tuples keep the cache key stable)
+    filtered_df, match_count = filter_sales(
+        data_mtime,
+        tuple(sorted(status_filter)),
+        tuple(sorted(region_filter)),
+        tuple(sorted(customer_type_filter))
+    )
+    
+    st.dataframe(
+        filtered_df,
+        column_config={"date": st.column_config.DateColumn("date")},
+        use_container_width=True
+    )
+    
+    st.markdown(f"*Showing {len(filtered_df)} of {match_count} filtered sales*")
+
+def _render_customers_tab(frames):
+    """Customer reference data and distributions"""
+    st.markdown("#### Customer Information")
+    st.markdown("*The **Enhanced Approach** understands customer types, regions, and industries as semantic concepts*")
+    
+    st.dataframe(frames['customers'], use_container_width=True)
+    
+    # Customer distribution
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Customers by Type**")
+        st.bar_chart(frames['customers_type_counts'])
+    
+    with col2:
+        st.markdown("**Customers by Region**")
+        st.bar_chart(frames['customers_region_counts'])
+
+def _render_products_tab(frames):
+    """Product catalog and category/price charts"""
+    st.markdown("#### Product Catalog")
+    st.markdown("*The **Enhanced Approach** knows product categories form hierarchies and have industry affinities*")
+    
+    st.dataframe(frames['products'], use_container_width=True)
+    
+    # Product analysis
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Products by Category**")
+        st.bar_chart(frames['products_cat_counts'])
+    
+    with col2:
+        st.markdown("**Price Distribution**")
+        st.bar_chart(frames['products_price_series'])
+
+def _render_reps_tab(frames):
+    """Sales representatives and experience charts"""
+    st.markdown("#### Sales Representatives")
+    st.markdown("*The **Enhanced Approach** understands rep experience influences performance*")
+    
+    st.dataframe(frames['sales_reps'], use_container_width=True)
+    
+    # Rep analysis
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Experience Distribution**")
+        st.bar_chart(frames['reps_experience_series'])
+    
+    with col2:
+        st.markdown("**Reps by Region**")
+        st.bar_chart(frames['reps_region_counts'])
+
+def revenue_bar_chart(table, dimension):
+    """Bar chart of net revenue per dimension, keeping the descending order"""
+    return alt.Chart(table).mark_bar().encode(
+        x=alt.X(f'{dimension}:N', sort='-y'),
+        y='net_revenue:Q'
+    )
+
+def _render_visualizations_tab(aggregates):
+    """Revenue charts from the precomputed aggregates"""
+    st.markdown("#### Data Visualizations")
+    
+    # Revenue by region
+    st.markdown("**Revenue by Region**")
+    st.altair_chart(revenue_bar_chart(aggregates['region_revenue'], 'customer_region'), use_container_width=True)
+    
+    # Revenue by customer type
+    st.markdown("**Revenue by Customer Type**")
+    st.altair_chart(revenue_bar_chart(aggregates['type_revenue'], 'customer_type'), use_container_width=True)
+    
+    # Top products
+    st.markdown("**Top 10 Products by Revenue**")
+    st.altair_chart(revenue_bar_chart(aggregates['product_revenue_top10'], 'product_name'), use_container_width=True)
+    
+    # Sales over time
+    st.markdown("**Sales Over Time**")
+    st.altair_chart(
+        alt.Chart(aggregates['daily_sales']).mark_line().encode(x='date:T', y='net_revenue:Q'),
+        use_container_width=True
+    )
+
 def display_data_view():
     """Display the actual data being analyzed"""
     
     st.markdown("## 📊 Sales Data Overview")
     st.markdown("This is the actual data that both approaches analyze. See how the **Enhanced approach** uses ontology to understand relationships.")
     
-    import pandas as pd
-    import json
-    
     # Load data
     try:
-        df = pd.read_csv("data/sales_data.csv")
-        with open("data/metadata.json", "r") as f:
-            metadata = json.load(f)
+        data_mtime = file_mtime(SALES_DATA_FILE)
+        df = load_sales_df(SALES_DATA_FILE, data_mtime)
+        aggregates = compute_sales_aggregates(data_mtime)
+        frames = metadata_frames("data/metadata.json", file_mtime("data/metadata.json"))
         
         # Summary metrics
         st.markdown("### 📈 Key Metrics")
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Total Sales", len(df))
+            st.metric("Total Sales", aggregates['total_sales'])
         with col2:
-            st.metric("Total Revenue", f"${df['net_revenue'].sum():,.0f}")
+            st.metric("Total Revenue", f"${aggregates['total_revenue']:,.0f}")
         with col3:
-            st.metric("Avg Deal Size", f"${df['net_revenue'].mean():,.0f}")
+            st.metric("Avg Deal Size", f"${aggregates['avg_deal']:,.0f}")
         with col4:
-            completed = (df['status'] == 'Completed').sum()
-            st.metric("Completed Sales", f"{completed} ({completed/len(df)*100:.0f}%)")
+            completed = aggregates['completed']
+            st.metric("Completed Sales", f"{completed} ({completed/aggregates['total_sales']*100:.0f}%)")
         
         st.divider()
         
-        # Tabs for different data views
-        data_tab1, data_tab2, data_tab3, data_tab4, data_tab5 = st.tabs([
-            "📋 Sales Transactions", 
-            "👥 Customers", 
-            "📦 Products", 
-            "💼 Sales Reps",
-            "📊 Visualizations"
-        ])
-        
-        with data_tab1:
-            st.markdown("#### Sales Transactions (Sample)")
-            st.markdown("*This is what the **Basic Approach** sees - flat tabular data*")
-            
-            # Filters
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                status_filter = st.multiselect("Status", df['status'].unique(), default=["Completed"])
-            with col2:
-                region_filter = st.multiselect("Region", df['customer_region'].unique())
-            with col3:
-                customer_type_filter = st.multiselect("Customer Type", df['customer_type'].unique())
-            
-            # Filter data
-            filtered_df = df.copy()
-            if status_filter:
-                filtered_df = filtered_df[filtered_df['status'].isin(status_filter)]
-            if region_filter:
-                filtered_df = filtered_df[filtered_df['customer_region'].isin(region_filter)]
-            if customer_type_filter:
-                filtered_df = filtered_df[filtered_df['customer_type'].isin(customer_type_filter)]
-            
-            st.dataframe(
-                filtered_df[[
-                    'sale_id', 'date', 'customer_name', 'customer_type', 
-                    'product_name', 'quantity', 'net_revenue', 'discount_percentage', 
-                    'sales_rep_name', 'status'
-                ]].head(100),
-                use_container_width=True
-            )
-            
-            st.markdown(f"*Showing {min(100, len(filtered_df))} of {len(filtered_df)} filtered sales*")
-        
-        with data_tab2:
-            st.markdown("#### Customer Information")
-            st.markdown("*The **Enhanced Approach** understands customer types, regions, and industries as semantic concepts*")
-            
-            customers_df = pd.DataFrame(metadata['customers'])
-            st.dataframe(customers_df, use_container_width=True)
-            
-            # Customer distribution
-            col1, col2 = st.columns(2)
-            with col1:
-                st.markdown("**Customers by Type**")
-                type_counts = customers_df['type'].value_counts()
-                st.bar_chart(type_counts)
-            
-            with col2:
-                st.markdown("**Customers by Region**")
-                region_counts = customers_df['region'].value_counts()
-                st.bar_chart(region_counts)
-        
-        with data_tab3:
-            st.markdown("#### Product Catalog")
-            st.markdown("*The **Enhanced Approach** knows product categories form hierarchies and have industry affinities*")
-            
-            products_df = pd.DataFrame(metadata['products'])
-            st.dataframe(products_df, use_container_width=True)
-            
-            # Product analysis
-            col1, col2 = st.columns(2)
-            with col1:
-                st.markdown("**Products by Category**")
-                cat_counts = products_df['category'].value_counts()
-                st.bar_chart(cat_counts)
-            
-            with col2:
-                st.markdown("**Price Distribution**")
-                st.bar_chart(products_df.set_index('name')['price'])
-        
-        with data_tab4:
-            st.markdown("#### Sales Representatives")
-            st.markdown("*The **Enhanced Approach** understands rep experience influences performance*")
-            
-            reps_df = pd.DataFrame(metadata['sales_reps'])
-            st.dataframe(reps_df, use_container_width=True)
-            
-            # Rep analysis
-            col1, col2 = st.columns(2)
-            with col1:
-                st.markdown("**Experience Distribution**")
-                st.bar_chart(reps_df.set_index('name')['experience_years'])
-            
-            with col2:
-                st.markdown("**Reps by Region**")
-                region_counts = reps_df['region'].value_counts()
-                st.bar_chart(region_counts)
+        # Only the selected view is built on each rerun
+        data_view = st.radio(
+            "Data view",
+            ["📋 Sales Transactions", "👥 Customers", "📦 Products", "💼 Sales Reps", "📊 Visualizations"],
+            horizontal=True,
+            key="data_view_tab",
+            label_visibility="collapsed"
+        )
         
-        with data_tab5:
-            st.markdown("#### Data Visualizations")
-            
-            # Revenue by region
-            st.markdown("**Revenue by Region**")
-            region_revenue = df.groupby('customer_region')['net_revenue'].sum().sort_values(ascending=False)
-            st.bar_chart(region_revenue)
-            
-            # Revenue by customer type
-            st.markdown("**Revenue by Customer Type**")
-            type_revenue = df.groupby('customer_type')['net_revenue'].sum().sort_values(ascending=False)
-            st.bar_chart(type_revenue)
-            
-            # Top products
-            st.markdown("**Top 10 Products by Revenue**")
-            product_revenue = df.groupby('product_name')['net_revenue'].sum().sort_values(ascending=False).head(10)
-            st.bar_chart(product_revenue)
-            
-            # Sales over time
-            st.markdown("**Sales Over Time**")
-            df['date'] = pd.to_datetime(df['date'])
-            daily_sales = df.groupby('date')['net_revenue'].sum().sort_index()
-            st.line_chart(daily_sales)
+        if data_view == "📋 Sales Transactions":
+            _render_transactions_tab(df, data_mtime)
+        elif data_view == "👥 Customers":
+            _render_customers_tab(frames)
+        elif data_view == "📦 Products":
+            _render_products_tab(frames)
+        elif data_view == "💼 Sales Reps":
+            _render_reps_tab(frames)
+        else:
+            _render_visualizations_tab(aggregates)
         
         st.divider()
         
@@ -504,7 +805,7 @@ def display_data_view():
             st.markdown("#### 🔸 Basic Approach")
             st.code("""
 # Flat table view:
-sales_data.csv
+sales_data.parquet
 - Just columns and rows
 - No relationships
 - No semantic meaning
@@ -540,234 +841,336 @@ python3 ontology.py
 python3 knowledge_graph.py
         """)
 
+ONTOLOGY_MD = """
+### What is an Ontology?
+
+An **ontology** is a formal representation of knowledge that defines:
+
+- **Classes**: Types of entities (Customer, Product, Sale, etc.)
+- **Properties**: Attributes and relationships
+- **Hierarchies**: Parent-child relationships (Enterprise is-a Customer)
+- **Constraints**: Business rules and logic
+
+#### Our Sales Ontology:
+
+```
+Customer
+├── EnterpriseCustomer
+├── MidMarketCustomer
+└── SMBCustomer
+
+Product
+├── ElectronicsProduct
+└── FurnitureProduct
+
+Relationships:
+- Sale soldTo Customer
+- Sale soldBy SalesRepresentative
+- Customer locatedIn Region
+- Product belongsToCategory
+```
+
+This structure gives the LLM **domain knowledge** and **semantic understanding**.
+"""
+
+KG_MD = """
+### What is a Knowledge Graph?
+
+A **Knowledge Graph** connects data through relationships:
+
+- **Nodes**: Entities (specific customers, products, sales)
+- **Edges**: Relationships (sold_to, located_in, belongs_to)
+- **Properties**: Attributes on nodes and edges
+
+#### Why It Matters:
+
+1. **Graph Traversal**: Follow relationships to find patterns
+   - "Find products bought by enterprise customers in tech industry"
+
+2. **Semantic Queries**: Ask about meaning, not just columns
+   - "What's the relationship between X and Y?"
+
+3. **Inference**: Derive new knowledge from existing relationships
+   - If Customer → Region → SalesRep, can infer best rep for customer
+
+4. **Context**: Rich context around each entity
+   - A customer isn't just data—it's connected to region, industry, purchases
+"""
+
+BENEFITS_MD = """
+### 🚀 How This Increases LLM Intelligence
+
+#### Without Ontology/KG (Basic Approach):
+❌ Treats data as flat tables  
+❌ No understanding of relationships  
+❌ Limited to column-based queries  
+❌ **Cannot answer WHY questions**  
+❌ **No causal reasoning**  
+❌ Shallow insights  
+
+#### With Ontology/KG (Enhanced Approach):
+✅ Understands domain concepts  
+✅ Knows semantic relationships  
+✅ Can traverse connected data  
+✅ **Answers WHY through causal reasoning**  
+✅ **Performs diagnostic analysis**  
+✅ Makes logical inferences  
+✅ Provides deep, contextual insights  
+
+---
+
+### 🧠 The Reasoning Advantage
+
+**Example: "Why is Laptop Pro 15 selling more?"**
+
+**Basic Approach (No Reasoning):**
+- "Laptop Pro 15 has $627K revenue with 560 units sold"
+- Just states the numbers
+- No explanation of WHY
+
+**Enhanced Approach (With Reasoning):**
+1. **Traces relationships**: Laptop → Electronics → Enterprise Customers → Technology Industry
+2. **Applies domain knowledge**: Premium products ($1,299) fit enterprise budgets
+3. **Identifies patterns**: Tech companies need computers for their work
+4. **Considers context**: North America has many tech companies
+5. **Explains causation**: "Laptops sell well BECAUSE:
+   - Technology companies are our largest customer segment
+   - Enterprise customers have budgets for premium products
+   - North America (our biggest region) has concentration of tech firms
+   - Essential tool for their business operations
+   - Sales reps can demonstrate ROI for work productivity"
+
+---
+
+### 🔍 Diagnostic Reasoning Examples
+
+**Q: "Why do experienced reps close bigger deals?"**
+
+**Reasoning Path:**
+```
+Sales Rep → experienceYears → averageDealSize
+      ↓
+operatesIn → Region → Customers → Industry
+      ↓
+madeSale → Sale → netRevenue → Product
+```
+
+**Causal Factors Identified:**
+1. Experience → Better customer relationships
+2. Experience → Understanding customer needs
+3. Regional knowledge → Industry expertise
+4. Trust building → Higher value sales
+5. Solution selling → Premium product positioning
+
+**Conclusion:** Experience enables consultative selling, not just transactional
+
+---
+
+### 📊 Pattern Recognition Through Graph Traversal
+
+The knowledge graph enables multi-hop reasoning:
+
+```
+Product "Laptop Pro" 
+  → belongsToCategory "Electronics"
+  → soldTo "Acme Corp" (Enterprise)
+  → locatedIn "North America"
+  → belongsToIndustry "Technology"
+  → soldBy "John Smith" (5 years exp)
+```
+
+**Insights from Pattern:**
+- Premium electronics → Tech enterprises → North America
+- This pattern repeats consistently
+- **Causal reasoning**: Tech companies need electronics for operations
+- **Predictive**: Target similar companies with same products
+
+---
+
+### Real-World Impact:
+
+**Scenario:** *"Sales declining for Product X in Region Y"*
+
+**Basic Approach:**
+- "Product X revenue decreased 15% in Region Y"
+- End of analysis
+
+**Enhanced Approach with Reasoning:**
+1. **Analyzes relationships**: Product X → Customer segments in Region Y
+2. **Identifies changes**: Shift in customer industry mix
+3. **Traces causation**: New industries don't need Product X functionality
+4. **Cross-references**: Similar regions show same pattern
+5. **Root cause**: Market demographic shift
+6. **Recommendation**: Introduce Product Z for new industries OR target different regions
+
+**Result:** Actionable diagnosis with clear next steps!
+"""
+
+REASONING_MD = """
+### 🎯 Reasoning Rules in Our Ontology
+
+Our sales ontology includes reasoning concepts that enable causal analysis:
+
+#### Defined Reasoning Classes:
+
+- **HighValueCustomer**: Customer with average deal size > $5000
+  - *Why matters*: Different sales approach needed
+
+- **FrequentBuyer**: Customer with multiple purchases  
+  - *Why matters*: Loyalty patterns indicate satisfaction
+
+- **PremiumProduct**: Product with price > $400
+  - *Why matters*: Targets specific customer segments
+
+- **ExperiencedRep**: Sales rep with > 5 years experience
+  - *Why matters*: Higher success rates, bigger deals
+
+- **RegionalPreference**: Product-Region affinity pattern
+  - *Why matters*: Cultural/market fit influences sales
+
+- **IndustryFit**: Product-Industry compatibility
+  - *Why matters*: Functional needs drive purchases
+
+- **DiscountSensitive**: Customer segment responding to discounts
+  - *Why matters*: Price optimization strategy
+
+#### Causal Relationship Properties:
+
+- **causedBy**: Direct causal relationship
+- **influences**: Factor that affects outcomes
+- **correlatesWith**: Statistical correlation
+- **indicatesPreference**: Shows buying patterns
+
+#### How LLM Uses These:
+
+When you ask "Why?", the LLM:
+1. Identifies relevant reasoning classes
+2. Traces causal properties in the graph
+3. Applies domain rules from ontology
+4. Explains relationships in business context
+5. Provides actionable insights
+
+This transforms correlation into causation!
+"""
+
 def display_ontology_explanation():
     """Display explanation of ontology and knowledge graph benefits"""
     
     st.markdown("## 🎓 Understanding the Intelligence Boost")
     
-    tab1, tab2, tab3, tab4 = st.tabs(["📚 Ontology", "🕸️ Knowledge Graph", "🚀 Benefits", "🧠 Reasoning"])
+    # Only the selected section is emitted on each rerun
+    section = st.radio(
+        "Section",
+        ["📚 Ontology", "🕸️ Knowledge Graph", "🚀 Benefits", "🧠 Reasoning"],
+        horizontal=True,
+        key="explanation_tab",
+        label_visibility="collapsed"
+    )
     
-    with tab1:
-        st.markdown("""
-        ### What is an Ontology?
-        
-        An **ontology** is a formal representation of knowledge that defines:
-        
-        - **Classes**: Types of entities (Customer, Product, Sale, etc.)
-        - **Properties**: Attributes and relationships
-        - **Hierarchies**: Parent-child relationships (Enterprise is-a Customer)
-        - **Constraints**: Business rules and logic
-        
-        #### Our Sales Ontology:
-        
-        ```
-        Customer
-        ├── EnterpriseCustomer
-        ├── MidMarketCustomer
-        └── SMBCustomer
-        
-        Product
-        ├── ElectronicsProduct
-        └── FurnitureProduct
-        
-        Relationships:
-        - Sale soldTo Customer
-        - Sale soldBy SalesRepresentative
-        - Customer locatedIn Region
-        - Product belongsToCategory
-        ```
-        
-        This structure gives the LLM **domain knowledge** and **semantic understanding**.
-        """)
+    explanations = {
+        "📚 Ontology": ONTOLOGY_MD,
+        "🕸️ Knowledge Graph": KG_MD,
+        "🚀 Benefits": BENEFITS_MD,
+        "🧠 Reasoning": REASONING_MD
+    }
+    st.markdown(explanations[section])
+
+@st.fragment
+def display_chat(analyzer_pair):
+    """Question input, answer comparison and history
     
-    with tab2:
-        st.markdown("""
-        ### What is a Knowledge Graph?
-        
-        A **Knowledge Graph** connects data through relationships:
-        
-        - **Nodes**: Entities (specific customers, products, sales)
-        - **Edges**: Relationships (sold_to, located_in, belongs_to)
-        - **Properties**: Attributes on nodes and edges
-        
-        #### Why It Matters:
-        
-        1. **Graph Traversal**: Follow relationships to find patterns
-           - "Find products bought by enterprise customers in tech industry"
-        
-        2. **Semantic Queries**: Ask about meaning, not just columns
-           - "What's the relationship between X and Y?"
-        
-        3. **Inference**: Derive new knowledge from existing relationships
-           - If Customer → Region → SalesRep, can infer best rep for customer
-        
-        4. **Context**: Rich context around each entity
-           - A customer isn't just data—it's connected to region, industry, purchases
-        """)
+    Runs as a fragment so Analyze and history clicks rerun only the chat
+    tab, not the data, Learn More and scaling tabs.
+    """
+    st.markdown("### Ask Questions About Sales Data")
+    st.info("💡 **Try WHY questions** to see reasoning in action! The ontology enables causal analysis.")
     
-    with tab3:
-        st.markdown("""
-        ### 🚀 How This Increases LLM Intelligence
-        
-        #### Without Ontology/KG (Basic Approach):
-        ❌ Treats data as flat tables  
-        ❌ No understanding of relationships  
-        ❌ Limited to column-based queries  
-        ❌ **Cannot answer WHY questions**  
-        ❌ **No causal reasoning**  
-        ❌ Shallow insights  
-        
-        #### With Ontology/KG (Enhanced Approach):
-        ✅ Understands domain concepts  
-        ✅ Knows semantic relationships  
-        ✅ Can traverse connected data  
-        ✅ **Answers WHY through causal reasoning**  
-        ✅ **Performs diagnostic analysis**  
-        ✅ Makes logical inferences  
-        ✅ Provides deep, contextual insights  
-        
-        ---
-        
-        ### 🧠 The Reasoning Advantage
-        
-        **Example: "Why is Laptop Pro 15 selling more?"**
-        
-        **Basic Approach (No Reasoning):**
-        - "Laptop Pro 15 has $627K revenue with 560 units sold"
-        - Just states the numbers
-        - No explanation of WHY
-        
-        **Enhanced Approach (With Reasoning):**
-        1. **Traces relationships**: Laptop → Electronics → Enterprise Customers → Technology Industry
-        2. **Applies domain knowledge**: Premium products ($1,299) fit enterprise budgets
-        3. **Identifies patterns**: Tech companies need computers for their work
-        4. **Considers context**: North America has many tech companies
-        5. **Explains causation**: "Laptops sell well BECAUSE:
-           - Technology companies are our largest customer segment
-           - Enterprise customers have budgets for premium products
-           - North America (our biggest region) has concentration of tech firms
-           - Essential tool for their business operations
-           - Sales reps can demonstrate ROI for work productivity"
-        
-        ---
-        
-        ### 🔍 Diagnostic Reasoning Examples
-        
-        **Q: "Why do experienced reps close bigger deals?"**
-        
-        **Reasoning Path:**
-        ```
-        Sales Rep → experienceYears → averageDealSize
-              ↓
-        operatesIn → Region → Customers → Industry
-              ↓
-        madeSale → Sale → netRevenue → Product
-        ```
-        
-        **Causal Factors Identified:**
-        1. Experience → Better customer relationships
-        2. Experience → Understanding customer needs
-        3. Regional knowledge → Industry expertise
-        4. Trust building → Higher value sales
-        5. Solution selling → Premium product positioning
-        
-        **Conclusion:** Experience enables consultative selling, not just transactional
-        
-        ---
-        
-        ### 📊 Pattern Recognition Through Graph Traversal
-        
-        The knowledge graph enables multi-hop reasoning:
-        
-        ```
-        Product "Laptop Pro" 
-          → belongsToCategory "Electronics"
-          → soldTo "Acme Corp" (Enterprise)
-          → locatedIn "North America"
-          → belongsToIndustry "Technology"
-          → soldBy "John Smith" (5 years exp)
-        ```
-        
-        **Insights from Pattern:**
-        - Premium electronics → Tech enterprises → North America
-        - This pattern repeats consistently
-        - **Causal reasoning**: Tech companies need electronics for operations
-        - **Predictive**: Target similar companies with same products
-        
-        ---
-        
-        ### Real-World Impact:
-        
-        **Scenario:** *"Sales declining for Product X in Region Y"*
-        
-        **Basic Approach:**
-        - "Product X revenue decreased 15% in Region Y"
-        - End of analysis
-        
-        **Enhanced Approach with Reasoning:**
-        1. **Analyzes relationships**: Product X → Customer segments in Region Y
-        2. **Identifies changes**: Shift in customer industry mix
-        3. **Traces causation**: New industries don't need Product X functionality
-        4. **Cross-references**: Similar regions show same pattern
-        5. **Root cause**: Market demographic shift
-        6. **Recommendation**: Introduce Product Z for new industries OR target different regions
-        
-        **Result:** Actionable diagnosis with clear next steps!
-        """)
+    # Initialize question input value
+    default_question = ""
+    if 'selected_question' in st.session_state:
+        default_question = st.session_state.selected_question
+        st.session_state.current_question = default_question
+        del st.session_state.selected_question
+    elif 'current_question' in st.session_state:
+        default_question = st.session_state.current_question
     
-    with tab4:
-        st.markdown("""
-        ### 🎯 Reasoning Rules in Our Ontology
-        
-        Our sales ontology includes reasoning concepts that enable causal analysis:
-        
-        #### Defined Reasoning Classes:
-        
-        - **HighValueCustomer**: Customer with average deal size > $5000
-          - *Why matters*: Different sales approach needed
-        
-        - **FrequentBuyer**: Customer with multiple purchases  
-          - *Why matters*: Loyalty patterns indicate satisfaction
-        
-        - **PremiumProduct**: Product with price > $400
-          - *Why matters*: Targets specific customer segments
-        
-        - **ExperiencedRep**: Sales rep with > 5 years experience
-          - *Why matters*: Higher success rates, bigger deals
-        
-        - **RegionalPreference**: Product-Region affinity pattern
-          - *Why matters*: Cultural/market fit influences sales
-        
-        - **IndustryFit**: Product-Industry compatibility
-          - *Why matters*: Functional needs drive purchases
-        
-        - **DiscountSensitive**: Customer segment responding to discounts
-          - *Why matters*: Price optimization strategy
-        
-        #### Causal Relationship Properties:
-        
-        - **causedBy**: Direct causal relationship
-        - **influences**: Factor that affects outcomes
-        - **correlatesWith**: Statistical correlation
-        - **indicatesPreference**: Shows buying patterns
-        
-        #### How LLM Uses These:
-        
-        When you ask "Why?", the LLM:
-        1. Identifies relevant reasoning classes
-        2. Traces causal properties in the graph
-        3. Applies domain rules from ontology
-        4. Explains relationships in business context
-        5. Provides actionable insights
-        
-        This transforms correlation into causation!
-        """)
+    # Question input
+    question = st.text_input(
+        "Enter your question:",
+        value=default_question,
+        placeholder="e.g., Why is Laptop Pro 15 our top-selling product?",
+        key="question_input"
+    )
+    
+    # Update current question in session state
+    if question:
+        st.session_state.current_question = question
+    
+    if st.button("🔍 Analyze", type="primary") and question:
+        with st.spinner("Analyzing with both approaches..."):
+            try:
+                # Get answers from both approaches (repeat questions hit the cache)
+                result = analyze_question(question, analyzer_pair)
+                
+                # Display comparison
+                display_answer_comparison(question, result["basic"], result["enhanced"])
+                
+                # Add to history
+                entry = {"question": question, **result}
+                st.session_state.chat_history.append(entry)
+                st.session_state.chat_history_total += 1
+                del st.session_state.chat_history[:-st.session_state.chat_history_limit]
+                
+                # Append only the new entry to the history file
+                append_chat_entry(entry)
+            
+            except Exception as e:
+                st.error(f"Error during analysis: {e}")
+    
+    # Display chat history
+    if st.session_state.chat_history:
+        st.markdown("---")
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.markdown("### 📜 Previous Questions")
+        with col2:
+            st.button("🗑️ Clear History", on_click=reset_chat_history)
+        
+        # Show most recent questions first (only the in-memory window).
+        # Entries are keyed by their position in the full history so the
+        # open/closed state survives new questions being added, and only
+        # opened entries pay for rendering the comparison.
+        expanded = st.session_state.history_expanded
+        for i, item in enumerate(reversed(st.session_state.chat_history)):
+            n = st.session_state.chat_history_total - 1 - i
+            is_open = expanded.get(n, False)
+            st.button(
+                f"{'▼' if is_open else '▶'} Q: {item['question']}",
+                key=f"history_toggle_{n}",
+                on_click=toggle_history_entry,
+                args=(n,),
+                use_container_width=True
+            )
+            if is_open:
+                display_answer_comparison(
+                    item['question'],
+                    item['basic'],
+                    item['enhanced'],
+                    key_prefix=f"history_{n}_"
+                )
+        
+        # Older entries stay on disk until requested
+        if (st.session_state.chat_history_total > len(st.session_state.chat_history)
+                and st.session_state.chat_history_limit < CHAT_HISTORY_MAX):
+            st.button("⬇️ Load earlier questions", on_click=load_earlier_history)
 
 def main():
     """Main application"""
     
     initialize_session_state()
     
+    st.html(CUSTOM_CSS)
+    
     # Header
     st.markdown('<div class="main-header">🧠 Ontology & Knowledge Graph Intelligence Demo</div>', unsafe_allow_html=True)
     st.markdown('<div class="sub-header">See how semantic understanding transforms LLM-based data analysis</div>', unsafe_allow_html=True)
@@ -792,92 +1195,19 @@ python knowledge_graph.py
         st.code("OPENAI_API_KEY=your_key_here")
         st.stop()
     
-    # Initialize analyzers
-    if not st.session_state.analyzers_ready:
-        with st.spinner("Initializing analyzers..."):
-            try:
-                st.session_state.basic_analyzer = BasicAnalyzer()
-                st.session_state.enhanced_analyzer = EnhancedAnalyzer()
-                st.session_state.analyzers_ready = True
-            except Exception as e:
-                st.error(f"Error initializing analyzers: {e}")
-                st.stop()
+    # Initialize analyzers (built once per process, shared across sessions)
+    with st.spinner("Initializing analyzers..."):
+        try:
+            analyzer_pair = get_analyzer_pair(file_mtime(SALES_DATA_FILE))
+        except Exception as e:
+            st.error(f"Error initializing analyzers: {e}")
+            st.stop()
     
     # Main interface tabs
     tab1, tab2, tab3, tab5 = st.tabs(["💬 Interactive Chat", "📊 View Data", "📖 Learn More", "🚀 Scaling to Production"])
     
     with tab1:
-        st.markdown("### Ask Questions About Sales Data")
-        st.info("💡 **Try WHY questions** to see reasoning in action! The ontology enables causal analysis.")
-        
-        # Initialize question input value
-        default_question = ""
-        if 'selected_question' in st.session_state:
-            default_question = st.session_state.selected_question
-            st.session_state.current_question = default_question
-            del st.session_state.selected_question
-        elif 'current_question' in st.session_state:
-            default_question = st.session_state.current_question
-        
-        # Question input
-        question = st.text_input(
-            "Enter your question:",
-            value=default_question,
-            placeholder="e.g., Why is Laptop Pro 15 our top-selling product?",
-            key="question_input"
-        )
-        
-        # Update current question in session state
-        if question:
-            st.session_state.current_question = question
-        
-        if st.button("🔍 Analyze", type="primary") and question:
-            with st.spinner("Analyzing with both approaches..."):
-                try:
-                    # Get answers from both approaches
-                    basic_answer, basic_meta = st.session_state.basic_analyzer.analyze(question)
-                    enhanced_answer, enhanced_meta = st.session_state.enhanced_analyzer.analyze(question)
-                    
-                    # Display comparison
-                    display_answer_comparison(
-                        question,
-                        {"answer": basic_answer, "metadata": basic_meta},
-                        {"answer": enhanced_answer, "metadata": enhanced_meta}
-                    )
-                    
-                    # Add to history
-                    st.session_state.chat_history.append({
-                        "question": question,
-                        "basic": {"answer": basic_answer, "metadata": basic_meta},
-                        "enhanced": {"answer": enhanced_answer, "metadata": enhanced_meta}
-                    })
-                    
-                    # Save history to file
-                    save_chat_history(st.session_state.chat_history)
-                    
-                except Exception as e:
-                    st.error(f"Error during analysis: {e}")
-        
-        # Display chat history
-        if st.session_state.chat_history:
-            st.markdown("---")
-            col1, col2 = st.columns([3, 1])
-            with col1:
-                st.markdown("### 📜 Previous Questions")
-            with col2:
-                if st.button("🗑️ Clear History"):
-                    st.session_state.chat_history = []
-                    save_chat_history([])
-                    st.rerun()
-            
-            # Show most recent questions first (up to 10)
-            for i, item in enumerate(reversed(st.session_state.chat_history[-10:])):
-                with st.expander(f"Q: {item['question']}", expanded=False):
-                    display_answer_comparison(
-                        item['question'],
-                        item['basic'],
-                        item['enhanced']
-                    )
+        display_chat(analyzer_pair)
     
     with tab2:
         display_data_view()
@@ -1,12 +1,25 @@
 """
 Generate sample sales data for the demo
 """
+import gzip
+import os
+import numpy as np
 import pandas as pd
-import random
-from datetime import datetime, timedelta
-import json
+import orjson
 
-def generate_sales_data(num_records=500):
+SALES_NS = "http://example.org/sales#"
+RDF_TYPE = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>"
+XSD_NS = "http://www.w3.org/2001/XMLSchema#"
+
+# Discount tiers by gross revenue: up to 5k, up to 10k, above 10k
+DISCOUNT_THRESHOLDS = [5000, 10000]
+DISCOUNT_CHOICES = [[0], [5, 10], [10, 15, 20]]
+
+def to_columns(records):
+    """Turn a list of dicts into one NumPy array per field"""
+    return {key: np.array([r[key] for r in records]) for key in records[0]}
+
+def generate_sales_data(num_records=500, write_csv=False):
     """Generate realistic sales data"""
     
     # Define data components
@@ -44,76 +57,87 @@ def generate_sales_data(num_records=500):
         {"id": "SR005", "name": "David Brown", "region": "Europe", "experience_years": 6},
     ]
     
-    # Generate sales records
-    sales_data = []
-    start_date = datetime(2024, 1, 1)
-    
-    for i in range(num_records):
-        customer = random.choice(customers)
-        product = random.choice(products)
-        
-        # Sales rep from matching region
-        matching_reps = [rep for rep in sales_reps if rep["region"] == customer["region"]]
-        sales_rep = random.choice(matching_reps) if matching_reps else random.choice(sales_reps)
-        
-        # Generate date
-        days_offset = random.randint(0, 365)
-        sale_date = start_date + timedelta(days=days_offset)
-        
-        # Generate quantity (more for enterprise customers)
-        if customer["type"] == "Enterprise":
-            quantity = random.randint(10, 50)
-        elif customer["type"] == "Mid-Market":
-            quantity = random.randint(5, 20)
-        else:
-            quantity = random.randint(1, 10)
-        
-        # Calculate revenue
-        revenue = product["price"] * quantity
-        
-        # Add discount for large orders
-        discount_percentage = 0
-        if revenue > 10000:
-            discount_percentage = random.choice([10, 15, 20])
-        elif revenue > 5000:
-            discount_percentage = random.choice([5, 10])
-        
-        final_revenue = revenue * (1 - discount_percentage / 100)
-        
-        # Status
-        status = random.choices(
-            ["Completed", "Pending", "Cancelled"],
-            weights=[0.85, 0.10, 0.05]
-        )[0]
-        
-        sales_data.append({
-            "sale_id": f"S{str(i+1).zfill(4)}",
-            "date": sale_date.strftime("%Y-%m-%d"),
-            "customer_id": customer["id"],
-            "customer_name": customer["name"],
-            "customer_type": customer["type"],
-            "customer_region": customer["region"],
-            "customer_industry": customer["industry"],
-            "product_id": product["id"],
-            "product_name": product["name"],
-            "product_category": product["category"],
-            "product_subcategory": product["subcategory"],
-            "unit_price": product["price"],
-            "quantity": quantity,
-            "gross_revenue": revenue,
-            "discount_percentage": discount_percentage,
-            "net_revenue": final_revenue,
-            "sales_rep_id": sales_rep["id"],
-            "sales_rep_name": sales_rep["name"],
-            "sales_rep_experience": sales_rep["experience_years"],
-            "status": status
-        })
-    
-    # Create DataFrame
-    df = pd.DataFrame(sales_data)
-    
-    # Save to CSV
-    df.to_csv("data/sales_data.csv", index=False)
+    # Generate sales records column-wise (seeded so demo runs are reproducible)
+    rng = np.random.default_rng(int(os.environ.get("DEMO_SEED", "42")))
+    start_date = pd.Timestamp("2024-01-01")
+    
+    # Field arrays, gathered by index instead of per-row dict lookups
+    cust = to_columns(customers)
+    prod = to_columns(products)
+    rep = to_columns(sales_reps)
+    
+    cust_idx = rng.integers(0, len(customers), num_records)
+    prod_idx = rng.integers(0, len(products), num_records)
+    
+    # Sales rep from matching region (index built once, then one draw per region)
+    reps_by_region = {}
+    for i, region in enumerate(rep["region"]):
+        reps_by_region.setdefault(region, []).append(i)
+    all_reps = np.arange(len(sales_reps))
+    
+    cust_region = cust["region"][cust_idx]
+    rep_idx = np.empty(num_records, dtype=int)
+    for region in np.unique(cust_region):
+        in_region = cust_region == region
+        matching_reps = np.array(reps_by_region.get(region, all_reps))
+        rep_idx[in_region] = rng.choice(matching_reps, size=in_region.sum())
+    
+    # Generate dates
+    days_offset = rng.integers(0, 366, num_records)
+    dates = (start_date + pd.to_timedelta(days_offset, unit="D")).strftime("%Y-%m-%d")
+    
+    # Generate quantity (more for enterprise customers)
+    cust_type = cust["type"][cust_idx]
+    quantity = np.where(
+        cust_type == "Enterprise", rng.integers(10, 51, num_records),
+        np.where(cust_type == "Mid-Market", rng.integers(5, 21, num_records), rng.integers(1, 11, num_records))
+    )
+    
+    # Calculate revenue
+    prices = prod["price"][prod_idx]
+    revenue = prices * quantity
+    
+    # Add discount for large orders (one draw per tier, scattered back by mask)
+    tier = np.searchsorted(DISCOUNT_THRESHOLDS, revenue)
+    discount_percentage = np.zeros(num_records, dtype=int)
+    for t, choices in enumerate(DISCOUNT_CHOICES):
+        in_tier = tier == t
+        discount_percentage[in_tier] = rng.choice(choices, size=in_tier.sum())
+    
+    final_revenue = revenue * (1 - discount_percentage / 100)
+    
+    # Status
+    status = rng.choice(["Completed", "Pending", "Cancelled"], size=num_records, p=[0.85, 0.10, 0.05])
+    
+    # Create DataFrame; low-cardinality strings are categorical from the start
+    # (Parquet then stores each as one dictionary plus integer codes)
+    df = pd.DataFrame({
+        "sale_id": "S" + pd.RangeIndex(1, num_records + 1).astype(str).str.zfill(4),
+        "date": dates,
+        "customer_id": cust["id"][cust_idx],
+        "customer_name": cust["name"][cust_idx],
+        "customer_type": pd.Categorical(cust_type),
+        "customer_region": pd.Categorical(cust_region),
+        "customer_industry": pd.Categorical(cust["industry"][cust_idx]),
+        "product_id": prod["id"][prod_idx],
+        "product_name": prod["name"][prod_idx],
+        "product_category": pd.Categorical(prod["category"][prod_idx]),
+        "product_subcategory": pd.Categorical(prod["subcategory"][prod_idx]),
+        "unit_price": prices,
+        "quantity": quantity,
+        "gross_revenue": revenue,
+        "discount_percentage": discount_percentage,
+        "net_revenue": final_revenue,
+        "sales_rep_id": rep["id"][rep_idx],
+        "sales_rep_name": pd.Categorical(rep["name"][rep_idx]),
+        "sales_rep_experience": rep["experience_years"][rep_idx],
+        "status": pd.Categorical(status)
+    })
+    
+    # Save to Parquet (CSV export is opt-in)
+    df.to_parquet("data/sales_data.parquet", engine="pyarrow", compression="snappy", index=False)
+    if write_csv:
+        df.to_csv("data/sales_data.csv", index=False)
     
     # Save metadata
     metadata = {
@@ -122,21 +146,73 @@ def generate_sales_data(num_records=500):
         "sales_reps": sales_reps
     }
     
-    with open("data/metadata.json", "w") as f:
-        json.dump(metadata, f, indent=2)
+    with open("data/metadata.json", "wb") as f:
+        f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
     
     print(f"Generated {num_records} sales records")
     print(f"\nData summary:")
-    print(f"Total Revenue: ${df['net_revenue'].sum():,.2f}")
-    print(f"Average Deal Size: ${df['net_revenue'].mean():,.2f}")
-    print(f"Date Range: {df['date'].min()} to {df['date'].max()}")
+    rev_stats = df['net_revenue'].agg(['sum', 'mean'])
+    date_stats = df['date'].agg(['min', 'max'])
+    print(f"Total Revenue: ${rev_stats['sum']:,.2f}")
+    print(f"Average Deal Size: ${rev_stats['mean']:,.2f}")
+    print(f"Date Range: {date_stats['min']} to {date_stats['max']}")
     print(f"\nFiles saved:")
-    print("  - data/sales_data.csv")
+    print("  - data/sales_data.parquet")
+    if write_csv:
+        print("  - data/sales_data.csv")
     print("  - data/metadata.json")
     
     return df, metadata
 
+def to_ntriples(df, path="data/sales.nt.gz"):
+    """Write the sale triples as gzipped N-Triples for graph database bulk loaders
+    
+    Mirrors KnowledgeGraphBuilder._sale_quads, but builds each triple column
+    with vectorized string concatenation instead of one rdflib call per value.
+    Returns the number of triples written.
+    """
+    def uri(col):
+        return "<" + SALES_NS + df[col].astype(str) + ">"
+    
+    def literal(col, datatype=None):
+        value = '"' + df[col].astype(str) + '"'
+        return value + f"^^<{XSD_NS}{datatype}>" if datatype else value
+    
+    def decimal(col):
+        # Fixed-point digits: str() can give forms like 1e-05, which are not
+        # valid xsd:decimal lexical values
+        value = df[col].astype(float).map(lambda v: np.format_float_positional(v, trim="-"))
+        return '"' + value + f'"^^<{XSD_NS}decimal>'
+    
+    sale = uri("sale_id")
+    predicate_objects = [
+        (RDF_TYPE, f"<{SALES_NS}Sale>"),
+        (f"<{SALES_NS}saleId>", literal("sale_id")),
+        (f"<{SALES_NS}saleDate>", literal("date", "date")),
+        (f"<{SALES_NS}quantity>", literal("quantity", "integer")),
+        (f"<{SALES_NS}grossRevenue>", decimal("gross_revenue")),
+        (f"<{SALES_NS}netRevenue>", decimal("net_revenue")),
+        (f"<{SALES_NS}discountPercentage>", decimal("discount_percentage")),
+        (f"<{SALES_NS}status>", literal("status")),
+        (f"<{SALES_NS}soldTo>", uri("customer_id")),
+        (f"<{SALES_NS}productSold>", uri("product_id")),
+        (f"<{SALES_NS}soldBy>", uri("sales_rep_id")),
+    ]
+    
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for predicate, obj in predicate_objects:
+            f.write("".join(sale + " " + predicate + " " + obj + " .\n"))
+    
+    return len(df) * len(predicate_objects)
+
 if __name__ == "__main__":
-    import os
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate sample sales data")
+    parser.add_argument("--csv", action="store_true", help="also write data/sales_data.csv")
+    parser.add_argument("--ntriples", action="store_true", help="also write data/sales.nt.gz for bulk loading")
+    args = parser.parse_args()
     os.makedirs("data", exist_ok=True)
-    generate_sales_data(500)
+    df, _ = generate_sales_data(500, write_csv=args.csv)
+    if args.ntriples:
+        count = to_ntriples(df)
+        print(f"  - data/sales.nt.gz ({count:,} triples)")
@@ -4,410 +4,726 @@ Populates the knowledge graph with sales data based on the ontology
 """
 from rdflib import Graph, Namespace, Literal, URIRef
 from rdflib.namespace import RDF, RDFS, OWL, XSD
+from rdflib.plugins.sparql import prepareQuery
 import pandas as pd
+import importlib.util
 import json
+import os
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache
+from itertools import chain
 from ontology import SalesOntology
 
+# Insights precomputed at setup time, so analyzers can skip the graph build
+INSIGHTS_FILE = "data/kg_insights.json"
+
+# Oxigraph (via oxrdflib) keeps triples in a native store and runs SPARQL in
+# compiled code; fall back to rdflib's in-memory store if it isn't installed
+GRAPH_STORE = "Oxigraph" if importlib.util.find_spec("oxrdflib") is not None else "default"
+
+REGIONS = ["North America", "Europe", "Asia"]
+
+INDUSTRIES = ["Technology", "Consulting", "Creative", "Finance", "Retail", 
+              "Manufacturing", "Healthcare", "Education"]
+
+CATEGORIES = {
+    "Electronics": ["Computers", "Accessories", "Displays", "Mobile Devices"],
+    "Furniture": ["Seating", "Desks", "Lighting", "Storage"]
+}
+
+# Metadata records, converted from the JSON dicts once per load
+Product = namedtuple('Product', ['id', 'name', 'category', 'subcategory', 'price'])
+Customer = namedtuple('Customer', ['id', 'name', 'type', 'region', 'industry'])
+SalesRep = namedtuple('SalesRep', ['id', 'name', 'region', 'experience_years'])
+
+# Sales columns used for sale triples; Parquet only reads these from disk
+SALES_COLUMNS = [
+    'sale_id', 'date', 'quantity', 'gross_revenue', 'net_revenue', 'discount_percentage', 'status',
+    'customer_id', 'product_id', 'sales_rep_id'
+]
+
+# SPARQL used by the insight methods, keyed by name. rdflib's own store
+# runs queries it has already parsed, so they are prepared once here;
+# Oxigraph parses query text natively (handing it rdflib's parsed algebra
+# would force rdflib's slower evaluator), so it gets the text as is.
+SPARQL_QUERIES = {
+    # Every completed sale with the measures and links the insights aggregate
+    "completed_sales": """
+    PREFIX sales: <http://example.org/sales#>
+
+    SELECT ?sale ?revenue ?quantity ?discount ?customer ?product ?rep
+    WHERE {
+        ?sale a sales:Sale ;
+              sales:netRevenue ?revenue ;
+              sales:quantity ?quantity ;
+              sales:discountPercentage ?discount ;
+              sales:soldTo ?customer ;
+              sales:productSold ?product ;
+              sales:soldBy ?rep ;
+              sales:status "Completed" .
+    }
+    """,
+    # Total revenue by region
+    "revenue_by_region": """
+    PREFIX sales: <http://example.org/sales#>
+    PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+
+    SELECT ?regionName (SUM(?revenue) AS ?totalRevenue) (COUNT(?sale) AS ?saleCount)
+    WHERE {
+        ?sale a sales:Sale ;
+              sales:soldTo ?customer ;
+              sales:netRevenue ?revenue ;
+              sales:status "Completed" .
+        ?customer sales:locatedIn ?region .
+        ?region sales:regionName ?regionName .
+    }
+    GROUP BY ?regionName
+    ORDER BY DESC(?totalRevenue)
+    """,
+    # Top products
+    "top_products": """
+    PREFIX sales: <http://example.org/sales#>
+
+    SELECT ?productName (SUM(?revenue) AS ?totalRevenue) (SUM(?quantity) AS ?totalQuantity)
+    WHERE {
+        ?sale a sales:Sale ;
+              sales:productSold ?product ;
+              sales:netRevenue ?revenue ;
+              sales:quantity ?quantity ;
+              sales:status "Completed" .
+        ?product sales:productName ?productName .
+    }
+    GROUP BY ?productName
+    ORDER BY DESC(?totalRevenue)
+    LIMIT 5
+    """,
+    # Sales by customer type
+    "revenue_by_customer_type": """
+    PREFIX sales: <http://example.org/sales#>
+
+    SELECT ?customerType (SUM(?revenue) AS ?totalRevenue) (AVG(?revenue) AS ?avgRevenue)
+    WHERE {
+        ?sale a sales:Sale ;
+              sales:soldTo ?customer ;
+              sales:netRevenue ?revenue ;
+              sales:status "Completed" .
+        ?customer sales:customerType ?customerType .
+    }
+    GROUP BY ?customerType
+    ORDER BY DESC(?totalRevenue)
+    """,
+    # The four reasoning analyses in one query: each UNION branch is a grouped
+    # subselect tagged with ?kind, and ?sortKey carries its ranking measure;
+    # the two top-10 branches apply their LIMIT inside the subselect.
+    #   product_customer_fit - why are certain products selling more?
+    #   regional_patterns    - why do certain regions perform better?
+    #   rep_effectiveness    - sales rep experience impact
+    #   discount_patterns    - discount patterns and effectiveness
+    "reasoning": """
+    PREFIX sales: <http://example.org/sales#>
+
+    SELECT * WHERE {
+        {
+            SELECT ("product_customer_fit" AS ?kind) ?productName ?customerType ?category
+                   (COUNT(?sale) AS ?salesCount)
+                   (SUM(?revenue) AS ?totalRevenue)
+                   (AVG(?revenue) AS ?avgDeal)
+                   (SUM(?revenue) AS ?sortKey)
+            WHERE {
+                ?sale a sales:Sale ;
+                      sales:soldTo ?customer ;
+                      sales:productSold ?product ;
+                      sales:netRevenue ?revenue ;
+                      sales:status "Completed" .
+                ?customer sales:customerType ?customerType .
+                ?product sales:productName ?productName ;
+                         sales:belongsToCategory ?cat .
+                ?cat sales:categoryName ?category .
+            }
+            GROUP BY ?productName ?customerType ?category
+            HAVING (COUNT(?sale) > 5)
+            ORDER BY DESC(?totalRevenue)
+            LIMIT 10
+        }
+        UNION
+        {
+            SELECT ("regional_patterns" AS ?kind) ?regionName ?industry ?productName
+                   (COUNT(?sale) AS ?salesCount)
+                   (SUM(?revenue) AS ?totalRevenue)
+                   (SUM(?revenue) AS ?sortKey)
+            WHERE {
+                ?sale a sales:Sale ;
+                      sales:soldTo ?customer ;
+                      sales:productSold ?product ;
+                      sales:netRevenue ?revenue ;
+                      sales:status "Completed" .
+                ?customer sales:locatedIn ?region ;
+                         sales:belongsToIndustry ?ind .
+                ?region sales:regionName ?regionName .
+                ?ind sales:industryName ?industry .
+                ?product sales:productName ?productName .
+            }
+            GROUP BY ?regionName ?industry ?productName
+            HAVING (COUNT(?sale) > 3)
+            ORDER BY DESC(?totalRevenue)
+            LIMIT 10
+        }
+        UNION
+        {
+            SELECT ("rep_effectiveness" AS ?kind) ?repName ?experience ?regionName
+                   (COUNT(?sale) AS ?salesCount)
+                   (SUM(?revenue) AS ?totalRevenue)
+                   (AVG(?revenue) AS ?avgDeal)
+                   (AVG(?revenue) AS ?sortKey)
+            WHERE {
+                ?sale a sales:Sale ;
+                      sales:soldBy ?rep ;
+                      sales:netRevenue ?revenue ;
+                      sales:status "Completed" .
+                ?rep sales:repName ?repName ;
+                     sales:experienceYears ?experience ;
+                     sales:operatesIn ?region .
+                ?region sales:regionName ?regionName .
+            }
+            GROUP BY ?repName ?experience ?regionName
+        }
+        UNION
+        {
+            SELECT ("discount_patterns" AS ?kind) ?customerType
+                   (AVG(?discount) AS ?avgDiscount)
+                   (AVG(?revenue) AS ?avgRevenue)
+                   (COUNT(?sale) AS ?salesCount)
+            WHERE {
+                ?sale a sales:Sale ;
+                      sales:soldTo ?customer ;
+                      sales:discountPercentage ?discount ;
+                      sales:netRevenue ?revenue ;
+                      sales:status "Completed" .
+                ?customer sales:customerType ?customerType .
+                FILTER(?discount > 0)
+            }
+            GROUP BY ?customerType
+        }
+    }
+    ORDER BY ?kind DESC(?sortKey)
+    """
+}
+
+if GRAPH_STORE == "default":
+    SPARQL_QUERIES = {name: prepareQuery(query) for name, query in SPARQL_QUERIES.items()}
+
+# How each insight's result rows map to output keys: key -> (variable, type)
+RESULT_FIELDS = {
+    "revenue_by_region": {
+        'region': ('regionName', str), 'revenue': ('totalRevenue', float), 'sales': ('saleCount', int)
+    },
+    "top_products": {
+        'product': ('productName', str), 'revenue': ('totalRevenue', float), 'units_sold': ('totalQuantity', int)
+    },
+    "revenue_by_customer_type": {
+        'customer_type': ('customerType', str), 'total_revenue': ('totalRevenue', float),
+        'avg_revenue': ('avgRevenue', float)
+    },
+    "product_customer_fit": {
+        'product': ('productName', str), 'customer_type': ('customerType', str), 'category': ('category', str),
+        'sales_count': ('salesCount', int), 'revenue': ('totalRevenue', float), 'avg_deal': ('avgDeal', float)
+    },
+    "regional_patterns": {
+        'region': ('regionName', str), 'industry': ('industry', str), 'product': ('productName', str),
+        'sales_count': ('salesCount', int), 'revenue': ('totalRevenue', float)
+    },
+    "rep_effectiveness": {
+        'rep': ('repName', str), 'experience': ('experience', int), 'region': ('regionName', str),
+        'sales_count': ('salesCount', int), 'revenue': ('totalRevenue', float), 'avg_deal': ('avgDeal', float)
+    },
+    "discount_patterns": {
+        'customer_type': ('customerType', str), 'avg_discount': ('avgDiscount', float),
+        'avg_revenue': ('avgRevenue', float), 'sales_count': ('salesCount', int)
+    },
+}
+
+def _row_to_dict(row, fields):
+    """Convert a result row using each Literal's already-parsed value
+    
+    float(literal) would re-parse the lexical form; toPython() returns the
+    value rdflib parsed when the Literal was created.
+    """
+    return {key: cast(row[var].toPython()) for key, (var, cast) in fields.items()}
+
 class KnowledgeGraphBuilder:
     """Build and query knowledge graph from sales data"""
     
+    # Lazily computed sections composed by get_insights / get_reasoning_insights
+    INSIGHTS = ('revenue_by_region', 'top_products', 'revenue_by_customer_type')
+    REASONING = ('product_customer_fit', 'regional_patterns', 'rep_effectiveness', 'discount_patterns')
+    
     def __init__(self, ontology: SalesOntology):
         self.ontology = ontology
-        self.graph = Graph()
+        self.graph = Graph(store=GRAPH_STORE)
         
-        # Copy ontology to knowledge graph
-        for triple in ontology.graph:
-            self.graph.add(triple)
+        # Copy the ontology's triples in with one batched insert. Its store is
+        # not shared: the app reuses one SalesOntology across rebuilt graphs,
+        # and this graph may use a different store backend.
+        self.graph.addN((s, p, o, self.graph) for s, p, o in ontology.triples())
         
         # Bind namespaces
         self.SALES = ontology.SALES
         self.graph.bind("sales", self.SALES)
         self.graph.bind("owl", OWL)
+        self.graph.bind("xsd", XSD)
+        
+        # Query results are cached per graph version; loading data bumps it
+        self._graph_version = 0
+        self._cached_query = lru_cache(maxsize=128)(self._run_query)
+        
+        # Completed sales pinned by load_sales_data, shared by all insights
+        self._completed_index = None
     
-    def load_sales_data(self, csv_path="data/sales_data.csv", metadata_path="data/metadata.json"):
-        """Load sales data and populate the knowledge graph"""
+    def load_sales_data(self, data_path="data/sales_data.parquet", metadata_path="data/metadata.json", df=None):
+        """Load sales data and populate the knowledge graph
+        
+        df, if given, is the sales table already read from data_path (see
+        read_sales_data), so callers can read it while doing other work.
+        """
         
-        df = pd.read_csv(csv_path)
+        if df is None:
+            df = read_sales_data(data_path)
         
         with open(metadata_path, 'r') as f:
             metadata = json.load(f)
-        
-        # Add entities
-        self._add_regions()
-        self._add_industries()
-        self._add_categories()
-        self._add_products(metadata['products'])
-        self._add_customers(metadata['customers'])
-        self._add_sales_reps(metadata['sales_reps'])
-        self._add_sales(df)
+        products = [Product(**p) for p in metadata['products']]
+        customers = [Customer(**c) for c in metadata['customers']]
+        sales_reps = [SalesRep(**r) for r in metadata['sales_reps']]
+        
+        # With every entity URI known up front the builders are independent:
+        # each returns its own quads, the sales table is split across workers,
+        # and everything is inserted with a single addN
+        self._index_entities(products, customers, sales_reps)
+        workers = min(4, os.cpu_count() or 1)
+        chunk_size = max(1, -(-len(df) // workers))
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self._region_quads),
+                executor.submit(self._industry_quads),
+                executor.submit(self._category_quads),
+                executor.submit(self._product_quads, products),
+                executor.submit(self._customer_quads, customers),
+                executor.submit(self._sales_rep_quads, sales_reps),
+            ]
+            futures += [
+                executor.submit(self._sale_quads, df.iloc[start:start + chunk_size])
+                for start in range(0, len(df), chunk_size)
+            ]
+            self.graph.addN(chain.from_iterable(future.result() for future in futures))
+        self._graph_version += 1
+        
+        self._pin_completed_sales()
+        for name in self.INSIGHTS + self.REASONING:
+            self.__dict__.pop(name, None)
         
         print(f"Knowledge graph populated with {len(self.graph)} triples")
     
-    def _add_regions(self):
-        """Add region entities"""
-        regions = ["North America", "Europe", "Asia"]
-        for region in regions:
-            region_uri = self.SALES[region.replace(" ", "_")]
-            self.graph.add((region_uri, RDF.type, self.SALES.Region))
-            self.graph.add((region_uri, self.SALES.regionName, Literal(region)))
-    
-    def _add_industries(self):
-        """Add industry entities"""
-        industries = ["Technology", "Consulting", "Creative", "Finance", "Retail", 
-                     "Manufacturing", "Healthcare", "Education"]
-        for industry in industries:
-            industry_uri = self.SALES[industry]
-            self.graph.add((industry_uri, RDF.type, self.SALES.Industry))
-            self.graph.add((industry_uri, self.SALES.industryName, Literal(industry)))
-    
-    def _add_categories(self):
-        """Add product categories"""
-        categories = {
-            "Electronics": ["Computers", "Accessories", "Displays", "Mobile Devices"],
-            "Furniture": ["Seating", "Desks", "Lighting", "Storage"]
-        }
-        
-        for category, subcategories in categories.items():
-            cat_uri = self.SALES[category]
-            self.graph.add((cat_uri, RDF.type, self.SALES.Category))
-            self.graph.add((cat_uri, self.SALES.categoryName, Literal(category)))
+    def _index_entities(self, products, customers, sales_reps):
+        """Build the URI lookups shared by the entity and sale builders"""
+        self._region_uri = {region: self.SALES[region.replace(" ", "_")] for region in REGIONS}
+        self._industry_uri = {industry: self.SALES[industry] for industry in INDUSTRIES}
+        self._cat_uri = {}
+        for category, subcategories in CATEGORIES.items():
+            self._cat_uri[category] = self.SALES[category]
+            for subcat in subcategories:
+                self._cat_uri[subcat] = self.SALES[subcat.replace(" ", "_")]
+        self._prod_uri = {p.id: self.SALES[p.id] for p in products}
+        self._cust_uri = {c.id: self.SALES[c.id] for c in customers}
+        self._rep_uri = {r.id: self.SALES[r.id] for r in sales_reps}
+    
+    def _region_quads(self):
+        """Region entities"""
+        quads = []
+        for region, region_uri in self._region_uri.items():
+            quads.append((region_uri, RDF.type, self.SALES.Region, self.graph))
+            quads.append((region_uri, self.SALES.regionName, Literal(region), self.graph))
+        return quads
+    
+    def _industry_quads(self):
+        """Industry entities"""
+        quads = []
+        for industry, industry_uri in self._industry_uri.items():
+            quads.append((industry_uri, RDF.type, self.SALES.Industry, self.graph))
+            quads.append((industry_uri, self.SALES.industryName, Literal(industry), self.graph))
+        return quads
+    
+    def _category_quads(self):
+        """Product categories and their subcategories"""
+        quads = []
+        for category, subcategories in CATEGORIES.items():
+            cat_uri = self._cat_uri[category]
+            quads.append((cat_uri, RDF.type, self.SALES.Category, self.graph))
+            quads.append((cat_uri, self.SALES.categoryName, Literal(category), self.graph))
             
             for subcat in subcategories:
-                subcat_uri = self.SALES[subcat.replace(" ", "_")]
-                self.graph.add((subcat_uri, RDF.type, self.SALES.Category))
-                self.graph.add((subcat_uri, self.SALES.categoryName, Literal(subcat)))
-                self.graph.add((subcat_uri, self.SALES.hasSubcategory, cat_uri))
+                subcat_uri = self._cat_uri[subcat]
+                quads.append((subcat_uri, RDF.type, self.SALES.Category, self.graph))
+                quads.append((subcat_uri, self.SALES.categoryName, Literal(subcat), self.graph))
+                quads.append((subcat_uri, self.SALES.hasSubcategory, cat_uri, self.graph))
+        return quads
     
-    def _add_products(self, products):
-        """Add product entities"""
+    def _product_quads(self, products):
+        """Product entities"""
+        quads = []
         for product in products:
-            prod_uri = self.SALES[product['id']]
+            prod_uri = self._prod_uri[product.id]
             
             # Type based on category
-            if product['category'] == 'Electronics':
-                self.graph.add((prod_uri, RDF.type, self.SALES.ElectronicsProduct))
+            if product.category == 'Electronics':
+                quads.append((prod_uri, RDF.type, self.SALES.ElectronicsProduct, self.graph))
             else:
-                self.graph.add((prod_uri, RDF.type, self.SALES.FurnitureProduct))
+                quads.append((prod_uri, RDF.type, self.SALES.FurnitureProduct, self.graph))
             
-            self.graph.add((prod_uri, self.SALES.productId, Literal(product['id'])))
-            self.graph.add((prod_uri, self.SALES.productName, Literal(product['name'])))
-            self.graph.add((prod_uri, self.SALES.unitPrice, Literal(product['price'], datatype=XSD.decimal)))
+            quads.append((prod_uri, self.SALES.productId, Literal(product.id), self.graph))
+            quads.append((prod_uri, self.SALES.productName, Literal(product.name), self.graph))
+            quads.append((prod_uri, self.SALES.unitPrice, Literal(product.price, datatype=XSD.decimal), self.graph))
             
             # Link to category
-            cat_uri = self.SALES[product['category']]
-            self.graph.add((prod_uri, self.SALES.belongsToCategory, cat_uri))
-            
-            subcat_uri = self.SALES[product['subcategory'].replace(" ", "_")]
-            self.graph.add((prod_uri, self.SALES.belongsToCategory, subcat_uri))
+            quads.append((prod_uri, self.SALES.belongsToCategory, self._cat_uri[product.category], self.graph))
+            quads.append((prod_uri, self.SALES.belongsToCategory, self._cat_uri[product.subcategory], self.graph))
+        return quads
     
-    def _add_customers(self, customers):
-        """Add customer entities"""
+    def _customer_quads(self, customers):
+        """Customer entities"""
+        quads = []
         for customer in customers:
-            cust_uri = self.SALES[customer['id']]
+            cust_uri = self._cust_uri[customer.id]
             
             # Type based on size
-            if customer['type'] == 'Enterprise':
-                self.graph.add((cust_uri, RDF.type, self.SALES.EnterpriseCustomer))
-            elif customer['type'] == 'SMB':
-                self.graph.add((cust_uri, RDF.type, self.SALES.SMBCustomer))
+            if customer.type == 'Enterprise':
+                quads.append((cust_uri, RDF.type, self.SALES.EnterpriseCustomer, self.graph))
+            elif customer.type == 'SMB':
+                quads.append((cust_uri, RDF.type, self.SALES.SMBCustomer, self.graph))
             else:
-                self.graph.add((cust_uri, RDF.type, self.SALES.MidMarketCustomer))
+                quads.append((cust_uri, RDF.type, self.SALES.MidMarketCustomer, self.graph))
             
-            self.graph.add((cust_uri, self.SALES.customerId, Literal(customer['id'])))
-            self.graph.add((cust_uri, self.SALES.customerName, Literal(customer['name'])))
-            self.graph.add((cust_uri, self.SALES.customerType, Literal(customer['type'])))
+            quads.append((cust_uri, self.SALES.customerId, Literal(customer.id), self.graph))
+            quads.append((cust_uri, self.SALES.customerName, Literal(customer.name), self.graph))
+            quads.append((cust_uri, self.SALES.customerType, Literal(customer.type), self.graph))
             
             # Link to region and industry
-            region_uri = self.SALES[customer['region'].replace(" ", "_")]
-            self.graph.add((cust_uri, self.SALES.locatedIn, region_uri))
-            
-            industry_uri = self.SALES[customer['industry']]
-            self.graph.add((cust_uri, self.SALES.belongsToIndustry, industry_uri))
+            quads.append((cust_uri, self.SALES.locatedIn, self._region_uri[customer.region], self.graph))
+            quads.append((cust_uri, self.SALES.belongsToIndustry, self._industry_uri[customer.industry], self.graph))
+        return quads
     
-    def _add_sales_reps(self, sales_reps):
-        """Add sales representative entities"""
+    def _sales_rep_quads(self, sales_reps):
+        """Sales representative entities"""
+        quads = []
         for rep in sales_reps:
-            rep_uri = self.SALES[rep['id']]
-            self.graph.add((rep_uri, RDF.type, self.SALES.SalesRepresentative))
-            self.graph.add((rep_uri, self.SALES.repId, Literal(rep['id'])))
-            self.graph.add((rep_uri, self.SALES.repName, Literal(rep['name'])))
-            self.graph.add((rep_uri, self.SALES.experienceYears, Literal(rep['experience_years'], datatype=XSD.integer)))
-            
-            region_uri = self.SALES[rep['region'].replace(" ", "_")]
-            self.graph.add((rep_uri, self.SALES.operatesIn, region_uri))
-    
-    def _add_sales(self, df):
-        """Add sale transaction entities"""
-        for _, row in df.iterrows():
-            sale_uri = self.SALES[row['sale_id']]
-            self.graph.add((sale_uri, RDF.type, self.SALES.Sale))
-            
-            # Sale attributes
-            self.graph.add((sale_uri, self.SALES.saleId, Literal(row['sale_id'])))
-            self.graph.add((sale_uri, self.SALES.saleDate, Literal(row['date'], datatype=XSD.date)))
-            self.graph.add((sale_uri, self.SALES.quantity, Literal(row['quantity'], datatype=XSD.integer)))
-            self.graph.add((sale_uri, self.SALES.grossRevenue, Literal(row['gross_revenue'], datatype=XSD.decimal)))
-            self.graph.add((sale_uri, self.SALES.netRevenue, Literal(row['net_revenue'], datatype=XSD.decimal)))
-            self.graph.add((sale_uri, self.SALES.discountPercentage, Literal(row['discount_percentage'], datatype=XSD.decimal)))
-            self.graph.add((sale_uri, self.SALES.status, Literal(row['status'])))
-            
-            # Relationships
-            cust_uri = self.SALES[row['customer_id']]
-            self.graph.add((sale_uri, self.SALES.soldTo, cust_uri))
-            
-            prod_uri = self.SALES[row['product_id']]
-            self.graph.add((sale_uri, self.SALES.productSold, prod_uri))
-            
-            rep_uri = self.SALES[row['sales_rep_id']]
-            self.graph.add((sale_uri, self.SALES.soldBy, rep_uri))
-    
-    def query_sparql(self, query):
-        """Execute SPARQL query"""
-        return self.graph.query(query)
+            rep_uri = self._rep_uri[rep.id]
+            quads.append((rep_uri, RDF.type, self.SALES.SalesRepresentative, self.graph))
+            quads.append((rep_uri, self.SALES.repId, Literal(rep.id), self.graph))
+            quads.append((rep_uri, self.SALES.repName, Literal(rep.name), self.graph))
+            quads.append((rep_uri, self.SALES.experienceYears, Literal(rep.experience_years, datatype=XSD.integer), self.graph))
+            quads.append((rep_uri, self.SALES.operatesIn, self._region_uri[rep.region], self.graph))
+        return quads
     
-    def get_insights(self):
-        """Generate analytical insights using SPARQL queries"""
+    def _sale_quads(self, df):
+        """Sale transaction entities for a slice of the sales table"""
+        # Work column by column rather than row by row
+        sale_uris = [self.SALES[sale_id] for sale_id in df['sale_id'].tolist()]
         
-        insights = {}
+        def literals(col, datatype=None):
+            return [Literal(value, datatype=datatype) for value in df[col].tolist()]
         
-        # Total revenue by region
-        query_region = """
-        PREFIX sales: <http://example.org/sales#>
-        PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+        def shared_literals(col, datatype=None):
+            # Low-cardinality columns: one Literal per distinct value, reused
+            values = df[col].tolist()
+            known = {value: Literal(value, datatype=datatype) for value in set(values)}
+            return [known[value] for value in values]
         
-        SELECT ?regionName (SUM(?revenue) AS ?totalRevenue) (COUNT(?sale) AS ?saleCount)
-        WHERE {
-            ?sale a sales:Sale ;
-                  sales:soldTo ?customer ;
-                  sales:netRevenue ?revenue ;
-                  sales:status "Completed" .
-            ?customer sales:locatedIn ?region .
-            ?region sales:regionName ?regionName .
-        }
-        GROUP BY ?regionName
-        ORDER BY DESC(?totalRevenue)
-        """
+        def uris(col, known):
+            return [known[value] for value in df[col].tolist()]
         
-        results = self.query_sparql(query_region)
-        insights['revenue_by_region'] = [
-            {
-                'region': str(row.regionName),
-                'revenue': float(row.totalRevenue),
-                'sales': int(row.saleCount)
-            }
-            for row in results
+        columns = [
+            # Sale attributes
+            (self.SALES.saleId, literals('sale_id')),
+            (self.SALES.saleDate, shared_literals('date', XSD.date)),
+            (self.SALES.quantity, literals('quantity', XSD.integer)),
+            (self.SALES.grossRevenue, literals('gross_revenue', XSD.decimal)),
+            (self.SALES.netRevenue, literals('net_revenue', XSD.decimal)),
+            (self.SALES.discountPercentage, shared_literals('discount_percentage', XSD.decimal)),
+            (self.SALES.status, shared_literals('status')),
+            # Relationships
+            (self.SALES.soldTo, uris('customer_id', self._cust_uri)),
+            (self.SALES.productSold, uris('product_id', self._prod_uri)),
+            (self.SALES.soldBy, uris('sales_rep_id', self._rep_uri)),
         ]
         
-        # Top products
-        query_products = """
-        PREFIX sales: <http://example.org/sales#>
+        quads = [(sale_uri, RDF.type, self.SALES.Sale, self.graph) for sale_uri in sale_uris]
+        for predicate, objects in columns:
+            quads.extend(
+                (sale_uri, predicate, obj, self.graph) for sale_uri, obj in zip(sale_uris, objects)
+            )
+        return quads
+    
+    def _pin_completed_sales(self):
+        """Evaluate the completed-sales pattern once for all insights
         
-        SELECT ?productName (SUM(?revenue) AS ?totalRevenue) (SUM(?quantity) AS ?totalQuantity)
-        WHERE {
-            ?sale a sales:Sale ;
-                  sales:productSold ?product ;
-                  sales:netRevenue ?revenue ;
-                  sales:quantity ?quantity ;
-                  sales:status "Completed" .
-            ?product sales:productName ?productName .
-        }
-        GROUP BY ?productName
-        ORDER BY DESC(?totalRevenue)
-        LIMIT 5
+        Each sale maps to (revenue, quantity, discount, customer, product, rep);
+        the handful of entities it links to get their attributes looked up once.
         """
+        self._completed_index = {
+            row.sale: (float(row.revenue.toPython()), int(row.quantity.toPython()),
+                       float(row.discount.toPython()), row.customer, row.product, row.rep)
+            for row in self.graph.query(SPARQL_QUERIES['completed_sales'])
+        }
         
-        results = self.query_sparql(query_products)
-        insights['top_products'] = [
-            {
-                'product': str(row.productName),
-                'revenue': float(row.totalRevenue),
-                'units_sold': int(row.totalQuantity)
-            }
-            for row in results
-        ]
-        
-        # Sales by customer type
-        query_customer_type = """
-        PREFIX sales: <http://example.org/sales#>
+        def name(node, predicate):
+            return str(self.graph.value(node, predicate))
         
-        SELECT ?customerType (SUM(?revenue) AS ?totalRevenue) (AVG(?revenue) AS ?avgRevenue)
-        WHERE {
-            ?sale a sales:Sale ;
-                  sales:soldTo ?customer ;
-                  sales:netRevenue ?revenue ;
-                  sales:status "Completed" .
-            ?customer sales:customerType ?customerType .
+        self._customer_attrs = {
+            cust_uri: (
+                name(cust_uri, self.SALES.customerType),
+                name(self.graph.value(cust_uri, self.SALES.locatedIn), self.SALES.regionName),
+                name(self.graph.value(cust_uri, self.SALES.belongsToIndustry), self.SALES.industryName)
+            )
+            for cust_uri in self._cust_uri.values()
         }
-        GROUP BY ?customerType
-        ORDER BY DESC(?totalRevenue)
-        """
+        self._product_attrs = {
+            prod_uri: (
+                name(prod_uri, self.SALES.productName),
+                [name(cat, self.SALES.categoryName)
+                 for cat in self.graph.objects(prod_uri, self.SALES.belongsToCategory)]
+            )
+            for prod_uri in self._prod_uri.values()
+        }
+        self._rep_attrs = {
+            rep_uri: (
+                name(rep_uri, self.SALES.repName),
+                int(self.graph.value(rep_uri, self.SALES.experienceYears)),
+                name(self.graph.value(rep_uri, self.SALES.operatesIn), self.SALES.regionName)
+            )
+            for rep_uri in self._rep_uri.values()
+        }
+    
+    def query_sparql(self, query):
+        """Execute SPARQL query (results are cached until the graph changes)"""
+        return self._cached_query(query, self._graph_version)
+    
+    def _run_query(self, query, graph_version):
+        """Run a query and materialize its rows so cached results can be re-read"""
+        return list(self.graph.query(query))
+    
+    def get_insights(self, use_sparql=False):
+        """Generate analytical insights
         
-        results = self.query_sparql(query_customer_type)
-        insights['revenue_by_customer_type'] = [
-            {
-                'customer_type': str(row.customerType),
-                'total_revenue': float(row.totalRevenue),
-                'avg_revenue': float(row.avgRevenue)
-            }
-            for row in results
+        Composes the per-section properties, each reduced in Python over the
+        pinned completed sales; use_sparql=True runs the equivalent SPARQL
+        queries instead, e.g. to check that both agree.
+        """
+        if use_sparql or self._completed_index is None:
+            return self._get_insights_sparql()
+        return {name: getattr(self, name) for name in self.INSIGHTS}
+    
+    def _get_insights_sparql(self):
+        """Generate analytical insights using SPARQL queries"""
+        return {
+            name: [_row_to_dict(row, RESULT_FIELDS[name]) for row in self.query_sparql(SPARQL_QUERIES[name])]
+            for name in self.INSIGHTS
+        }
+    
+    # Insight sections are computed on first access and kept until the next
+    # load_sales_data, so callers that need one section only pay for that one
+    
+    @cached_property
+    def revenue_by_region(self):
+        """Completed revenue and sale count per region, highest revenue first"""
+        by_region = defaultdict(lambda: [0.0, 0])
+        for revenue, _, _, customer, _, _ in (self._completed_index or {}).values():
+            totals = by_region[self._customer_attrs[customer][1]]
+            totals[0] += revenue
+            totals[1] += 1
+        return [
+            {'region': region, 'revenue': revenue, 'sales': count}
+            for region, (revenue, count) in sorted(by_region.items(), key=lambda item: -item[1][0])
         ]
-        
-        return insights
     
-    def get_reasoning_insights(self):
-        """Generate causal and diagnostic insights through reasoning"""
-        
-        reasoning = {}
-        
-        # Why are certain products selling more? - Product-Customer affinity
-        query_product_customer_fit = """
-        PREFIX sales: <http://example.org/sales#>
+    @cached_property
+    def top_products(self):
+        """The five products with the most completed revenue"""
+        by_product = defaultdict(lambda: [0.0, 0])
+        for revenue, quantity, _, _, product, _ in (self._completed_index or {}).values():
+            totals = by_product[self._product_attrs[product][0]]
+            totals[0] += revenue
+            totals[1] += quantity
+        return [
+            {'product': product, 'revenue': revenue, 'units_sold': units}
+            for product, (revenue, units) in sorted(by_product.items(), key=lambda item: -item[1][0])[:5]
+        ]
+    
+    @cached_property
+    def revenue_by_customer_type(self):
+        """Total and average completed revenue per customer type"""
+        by_customer_type = defaultdict(lambda: [0.0, 0])
+        for revenue, _, _, customer, _, _ in (self._completed_index or {}).values():
+            totals = by_customer_type[self._customer_attrs[customer][0]]
+            totals[0] += revenue
+            totals[1] += 1
+        return [
+            {'customer_type': ctype, 'total_revenue': revenue, 'avg_revenue': revenue / count}
+            for ctype, (revenue, count) in sorted(by_customer_type.items(), key=lambda item: -item[1][0])
+        ]
+    
+    def get_reasoning_insights(self, use_sparql=False):
+        """Generate causal and diagnostic insights through reasoning
         
-        SELECT ?productName ?customerType ?category 
-               (COUNT(?sale) AS ?salesCount) 
-               (SUM(?revenue) AS ?totalRevenue)
-               (AVG(?revenue) AS ?avgDeal)
-        WHERE {
-            ?sale a sales:Sale ;
-                  sales:soldTo ?customer ;
-                  sales:productSold ?product ;
-                  sales:netRevenue ?revenue ;
-                  sales:status "Completed" .
-            ?customer sales:customerType ?customerType .
-            ?product sales:productName ?productName ;
-                     sales:belongsToCategory ?cat .
-            ?cat sales:categoryName ?category .
-        }
-        GROUP BY ?productName ?customerType ?category
-        HAVING (COUNT(?sale) > 5)
-        ORDER BY DESC(?totalRevenue)
+        Like get_insights, composes the per-section properties unless
+        use_sparql=True.
         """
-        
-        results = self.query_sparql(query_product_customer_fit)
-        reasoning['product_customer_fit'] = [
+        if use_sparql or self._completed_index is None:
+            return self._get_reasoning_insights_sparql()
+        return {name: getattr(self, name) for name in self.REASONING}
+    
+    @cached_property
+    def product_customer_fit(self):
+        """Why are certain products selling more? Top product/customer type/category mixes"""
+        fit = defaultdict(lambda: [0, 0.0])
+        for revenue, _, _, customer, product, _ in (self._completed_index or {}).values():
+            customer_type = self._customer_attrs[customer][0]
+            product_name, categories = self._product_attrs[product]
+            for category in categories:
+                totals = fit[(product_name, customer_type, category)]
+                totals[0] += 1
+                totals[1] += revenue
+        
+        top_fit = sorted(
+            ((key, totals) for key, totals in fit.items() if totals[0] > 5),
+            key=lambda item: -item[1][1]
+        )[:10]
+        return [
             {
-                'product': str(row.productName),
-                'customer_type': str(row.customerType),
-                'category': str(row.category),
-                'sales_count': int(row.salesCount),
-                'revenue': float(row.totalRevenue),
-                'avg_deal': float(row.avgDeal)
+                'product': product_name,
+                'customer_type': customer_type,
+                'category': category,
+                'sales_count': count,
+                'revenue': revenue,
+                'avg_deal': revenue / count
             }
-            for i, row in enumerate(results) if i < 10
+            for (product_name, customer_type, category), (count, revenue) in top_fit
         ]
-        
-        # Why certain regions perform better? - Regional patterns with industries
-        query_regional_patterns = """
-        PREFIX sales: <http://example.org/sales#>
-        
-        SELECT ?regionName ?industry ?productName
-               (COUNT(?sale) AS ?salesCount)
-               (SUM(?revenue) AS ?revenue)
-        WHERE {
-            ?sale a sales:Sale ;
-                  sales:soldTo ?customer ;
-                  sales:productSold ?product ;
-                  sales:netRevenue ?revenue ;
-                  sales:status "Completed" .
-            ?customer sales:locatedIn ?region ;
-                     sales:belongsToIndustry ?ind .
-            ?region sales:regionName ?regionName .
-            ?ind sales:industryName ?industry .
-            ?product sales:productName ?productName .
-        }
-        GROUP BY ?regionName ?industry ?productName
-        HAVING (COUNT(?sale) > 3)
-        ORDER BY DESC(?revenue)
-        """
-        
-        results = self.query_sparql(query_regional_patterns)
-        reasoning['regional_patterns'] = [
+    
+    @cached_property
+    def regional_patterns(self):
+        """Why do certain regions perform better? Top region/industry/product mixes"""
+        regional = defaultdict(lambda: [0, 0.0])
+        for revenue, _, _, customer, product, _ in (self._completed_index or {}).values():
+            _, region, industry = self._customer_attrs[customer]
+            totals = regional[(region, industry, self._product_attrs[product][0])]
+            totals[0] += 1
+            totals[1] += revenue
+        
+        top_regional = sorted(
+            ((key, totals) for key, totals in regional.items() if totals[0] > 3),
+            key=lambda item: -item[1][1]
+        )[:10]
+        return [
             {
-                'region': str(row.regionName),
-                'industry': str(row.industry),
-                'product': str(row.productName),
-                'sales_count': int(row.salesCount),
-                'revenue': float(row.revenue)
+                'region': region,
+                'industry': industry,
+                'product': product_name,
+                'sales_count': count,
+                'revenue': revenue
             }
-            for i, row in enumerate(results) if i < 10
+            for (region, industry, product_name), (count, revenue) in top_regional
         ]
-        
-        # Sales rep effectiveness - experience impact
-        query_rep_effectiveness = """
-        PREFIX sales: <http://example.org/sales#>
-        
-        SELECT ?repName ?experience ?regionName
-               (COUNT(?sale) AS ?salesCount)
-               (SUM(?revenue) AS ?totalRevenue)
-               (AVG(?revenue) AS ?avgDeal)
-        WHERE {
-            ?sale a sales:Sale ;
-                  sales:soldBy ?rep ;
-                  sales:netRevenue ?revenue ;
-                  sales:status "Completed" .
-            ?rep sales:repName ?repName ;
-                 sales:experienceYears ?experience ;
-                 sales:operatesIn ?region .
-            ?region sales:regionName ?regionName .
-        }
-        GROUP BY ?repName ?experience ?regionName
-        ORDER BY DESC(?avgDeal)
-        """
-        
-        results = self.query_sparql(query_rep_effectiveness)
-        reasoning['rep_effectiveness'] = [
+    
+    @cached_property
+    def rep_effectiveness(self):
+        """Sales rep experience impact, highest average deal first"""
+        reps = defaultdict(lambda: [0, 0.0])
+        for revenue, _, _, _, _, rep in (self._completed_index or {}).values():
+            totals = reps[self._rep_attrs[rep]]
+            totals[0] += 1
+            totals[1] += revenue
+        return [
             {
-                'rep': str(row.repName),
-                'experience': int(row.experience),
-                'region': str(row.regionName),
-                'sales_count': int(row.salesCount),
-                'revenue': float(row.totalRevenue),
-                'avg_deal': float(row.avgDeal)
+                'rep': rep_name,
+                'experience': experience,
+                'region': region,
+                'sales_count': count,
+                'revenue': revenue,
+                'avg_deal': revenue / count
             }
-            for row in results
+            for (rep_name, experience, region), (count, revenue)
+            in sorted(reps.items(), key=lambda item: -item[1][1] / item[1][0])
         ]
-        
-        # Discount patterns and effectiveness
-        query_discount_patterns = """
-        PREFIX sales: <http://example.org/sales#>
-        
-        SELECT ?customerType 
-               (AVG(?discount) AS ?avgDiscount)
-               (AVG(?revenue) AS ?avgRevenue)
-               (COUNT(?sale) AS ?salesCount)
-        WHERE {
-            ?sale a sales:Sale ;
-                  sales:soldTo ?customer ;
-                  sales:discountPercentage ?discount ;
-                  sales:netRevenue ?revenue ;
-                  sales:status "Completed" .
-            ?customer sales:customerType ?customerType .
-            FILTER(?discount > 0)
-        }
-        GROUP BY ?customerType
-        """
-        
-        results = self.query_sparql(query_discount_patterns)
-        reasoning['discount_patterns'] = [
+    
+    @cached_property
+    def discount_patterns(self):
+        """Discount patterns and effectiveness per customer type"""
+        discounts = defaultdict(lambda: [0.0, 0.0, 0])
+        for revenue, _, discount, customer, _, _ in (self._completed_index or {}).values():
+            if discount > 0:
+                totals = discounts[self._customer_attrs[customer][0]]
+                totals[0] += discount
+                totals[1] += revenue
+                totals[2] += 1
+        return [
             {
-                'customer_type': str(row.customerType),
-                'avg_discount': float(row.avgDiscount),
-                'avg_revenue': float(row.avgRevenue),
-                'sales_count': int(row.salesCount)
+                'customer_type': customer_type,
+                'avg_discount': discount / count,
+                'avg_revenue': revenue / count,
+                'sales_count': count
             }
-            for row in results
+            for customer_type, (discount, revenue, count) in discounts.items()
         ]
+    
+    def _get_reasoning_insights_sparql(self):
+        """Generate reasoning insights with the combined SPARQL query"""
+        
+        # One query covers all four analyses; bucket its rows by ?kind
+        rows = {"product_customer_fit": [], "regional_patterns": [], "rep_effectiveness": [], "discount_patterns": []}
+        for row in self.query_sparql(SPARQL_QUERIES['reasoning']):
+            rows[str(row.kind)].append(row)
         
-        return reasoning
+        return {
+            kind: [_row_to_dict(row, RESULT_FIELDS[kind]) for row in kind_rows]
+            for kind, kind_rows in rows.items()
+        }
     
-    def save(self, filepath="data/knowledge_graph.ttl"):
-        """Save knowledge graph to file"""
-        self.graph.serialize(destination=filepath, format="turtle")
+    def save(self, filepath="data/knowledge_graph.ttl", format="turtle"):
+        """Save knowledge graph to file
+        
+        Turtle is the readable default; format="nt" writes line-oriented
+        N-Triples, which is much faster to write and parse for snapshots.
+        """
+        self.graph.serialize(destination=filepath, format=format, encoding="utf-8")
         print(f"Knowledge graph saved to {filepath}")
+    
+    def save_insights(self, filepath=INSIGHTS_FILE):
+        """Save get_insights and get_reasoning_insights results as JSON
+        
+        Analyzers load this instead of building the graph, as long as it is
+        newer than the sales data.
+        """
+        with open(filepath, 'w', encoding="utf-8") as f:
+            json.dump({"insights": self.get_insights(), "reasoning": self.get_reasoning_insights()}, f, indent=2)
+        print(f"Insights saved to {filepath}")
+
+def read_sales_data(data_path="data/sales_data.parquet"):
+    """Read the sales columns load_sales_data needs"""
+    return pd.read_parquet(data_path, columns=SALES_COLUMNS)
+
+def load_insights(filepath=INSIGHTS_FILE, data_path="data/sales_data.parquet"):
+    """Insights saved by save_insights, or None if missing or older than the sales data"""
+    try:
+        if os.path.getmtime(filepath) < os.path.getmtime(data_path):
+            return None
+        with open(filepath, 'r', encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
 def build_knowledge_graph():
     """Main function to build knowledge graph"""
-    import os
     os.makedirs("data", exist_ok=True)
     
     # Create ontology
@@ -417,6 +733,7 @@ def build_knowledge_graph():
     kg = KnowledgeGraphBuilder(ontology)
     kg.load_sales_data()
     kg.save()
+    kg.save_insights()
     
     # Get some insights
     print("\n=== Knowledge Graph Insights ===")
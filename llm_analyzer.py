@@ -3,60 +3,352 @@ LLM Integration for Sales Analysis
 Provides two approaches: basic (no ontology) and enhanced (with ontology/KG)
 """
 import os
-from openai import OpenAI
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import lru_cache
+from types import SimpleNamespace
+from openai import APIConnectionError, InternalServerError, OpenAI, RateLimitError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, stop_after_delay, wait_random_exponential
+import numpy as np
 import pandas as pd
 import json
 from typing import Dict, List, Tuple
-from knowledge_graph import KnowledgeGraphBuilder
+from knowledge_graph import KnowledgeGraphBuilder, load_insights, read_sales_data
 from ontology import SalesOntology
 
+EMBEDDING_MODEL = "text-embedding-3-small"
+# Cosine similarity above which a question reuses the answer to an earlier one
+# (0.9 is too loose for text-embedding-3-small: "top region by revenue" and
+# "worst region by revenue" score above it)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.96"))
+SEMANTIC_CACHE_SIZE = 256
+# Default for analyze's embedding argument: embed the question there
+EMBED_QUESTION = object()
+
+class SemanticCache:
+    """LRU cache of answers, looked up by question embedding similarity"""
+    
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD, max_entries: int = SEMANTIC_CACHE_SIZE):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # question -> (unit embedding, answer, metadata)
+        self._lock = threading.Lock()
+    
+    def get(self, embedding: np.ndarray):
+        """Return (question, similarity, answer, metadata) for the closest match, or None"""
+        with self._lock:
+            if not self._entries:
+                return None
+            questions = list(self._entries)
+            # Embeddings are unit length, so the dot product is the cosine
+            similarities = np.stack([entry[0] for entry in self._entries.values()]) @ embedding
+            best = int(similarities.argmax())
+            if similarities[best] < self.threshold:
+                return None
+            question = questions[best]
+            self._entries.move_to_end(question)
+            _, answer, metadata = self._entries[question]
+            return question, float(similarities[best]), answer, metadata
+    
+    def put(self, question: str, embedding: np.ndarray, answer: str, metadata: Dict):
+        """Store an answer, evicting the least recently used beyond max_entries"""
+        with self._lock:
+            self._entries[question] = (embedding, answer, metadata)
+            self._entries.move_to_end(question)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+# Optional client-side limits for sweeps; unset means no local throttling
+MAX_REQUESTS_PER_MINUTE = os.getenv("OPENAI_MAX_REQUESTS_PER_MINUTE")
+MAX_TOKENS_PER_MINUTE = os.getenv("OPENAI_MAX_TOKENS_PER_MINUTE")
+# 429s and transient errors are retried, by the client for most calls and
+# with longer exponential backoff for chat completions
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
+# Upper bound in seconds on the time spent retrying one chat completion, so
+# a rate-limited question can't hold an app request thread for minutes
+RETRY_TIME_LIMIT = float(os.getenv("OPENAI_RETRY_TIME_LIMIT", "60"))
+
+_backoff = wait_random_exponential(min=1, max=20)
+
+def _retry_wait(retry_state) -> float:
+    """Wait as long as the error's retry-after header asks, otherwise back off
+    exponentially, never past RETRY_TIME_LIMIT"""
+    response = getattr(retry_state.outcome.exception(), "response", None)
+    try:
+        wait = float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        wait = _backoff(retry_state)
+    return max(0.0, min(wait, RETRY_TIME_LIMIT - retry_state.seconds_since_start))
+
+class RateLimiter:
+    """Request and token buckets shared by every thread calling the API
+    
+    Both buckets refill continuously up to a minute's allowance; acquire()
+    blocks until there is room for one more request of the given size.
+    """
+    
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None):
+        self.capacity = []
+        for name, limit in (("requests_per_minute", requests_per_minute), ("tokens_per_minute", tokens_per_minute)):
+            capacity = float("inf") if limit in (None, "") else float(limit)
+            if not capacity > 0:
+                raise ValueError(f"{name} must be positive or unset, got {limit!r}")
+            self.capacity.append(capacity)
+        self.available = list(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_env(cls):
+        """Limiter configured from the environment, or None if no limit is set"""
+        if MAX_REQUESTS_PER_MINUTE is None and MAX_TOKENS_PER_MINUTE is None:
+            return None
+        try:
+            return cls(MAX_REQUESTS_PER_MINUTE, MAX_TOKENS_PER_MINUTE)
+        except ValueError as e:
+            raise ValueError(
+                f"Invalid OPENAI_MAX_REQUESTS_PER_MINUTE / OPENAI_MAX_TOKENS_PER_MINUTE: {e}"
+            ) from e
+    
+    def acquire(self, tokens: int):
+        """Wait until a request using about this many tokens may be sent"""
+        needed = [1.0, min(float(tokens), self.capacity[1])]
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed, self.updated = now - self.updated, now
+                self.available = [
+                    min(capacity, available + capacity * elapsed / 60)
+                    for capacity, available in zip(self.capacity, self.available)
+                ]
+                if all(available >= need for available, need in zip(self.available, needed)):
+                    self.available = [available - need for available, need in zip(self.available, needed)]
+                    return
+                wait = max(
+                    (need - available) * 60 / capacity
+                    for capacity, available, need in zip(self.capacity, self.available, needed)
+                    if available < need
+                )
+            time.sleep(wait)
+
+class AnswerStream:
+    """Iterable of answer pieces; answer and metadata are set once it is exhausted"""
+    
+    def __init__(self, pieces):
+        self._pieces = pieces  # generator yielding text and returning metadata
+        self.answer = None
+        self.metadata = None
+    
+    def __iter__(self):
+        parts = []
+        while True:
+            try:
+                piece = next(self._pieces)
+            except StopIteration as stop:
+                self.metadata = stop.value
+                break
+            parts.append(piece)
+            yield piece
+        self.answer = "".join(parts)
+
 class SalesAnalyzer:
     """Base class for sales analysis"""
     
-    def __init__(self, api_key: str = None):
-        if api_key is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=api_key)
+    # Set by subclasses: completion length limit and approach description
+    MAX_TOKENS = 500
+    APPROACH = {}
+    
+    def __init__(self, api_key: str = None, client: OpenAI = None, rate_limiter: RateLimiter = None):
+        if client is None:
+            if api_key is None:
+                api_key = os.getenv("OPENAI_API_KEY")
+            client = OpenAI(api_key=api_key, max_retries=MAX_RETRIES)
+        self.client = client
         self.model = "gpt-4"
+        self.answer_cache = SemanticCache()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter.from_env()
+    
+    def analyze(self, question: str, embedding=EMBED_QUESTION) -> Tuple[str, Dict]:
+        """Analyze a question and return answer with metadata
+        
+        Paraphrases of a recently answered question reuse its answer instead
+        of calling the model again. Pass the question's embedding (or None to
+        skip the cache) when it has already been computed.
+        """
+        stream = self.analyze_stream(question, embedding)
+        answer = "".join(stream)
+        return answer, stream.metadata
     
-    def analyze(self, question: str) -> Tuple[str, Dict]:
-        """Analyze a question and return answer with metadata"""
+    def analyze_stream(self, question: str, embedding=EMBED_QUESTION) -> "AnswerStream":
+        """Analyze a question, yielding the answer as the model generates it
+        
+        The metadata is set on the returned stream once it has been consumed.
+        """
+        return AnswerStream(self._generate(question, embedding))
+    
+    def _generate(self, question: str, embedding=EMBED_QUESTION):
+        """Yield answer pieces for a question, returning its metadata"""
+        if embedding is EMBED_QUESTION:
+            embedding = self.embed(question)
+        if embedding is not None:
+            hit = self.answer_cache.get(embedding)
+            if hit is not None:
+                cached_question, similarity, answer, metadata = hit
+                yield answer
+                return dict(
+                    metadata, cached_answer=f'Reused from "{cached_question}" (similarity {similarity:.2f})'
+                )
+        
+        stream = AnswerStream(self._generate_uncached(question))
+        yield from stream
+        if embedding is not None and "error" not in stream.metadata:
+            self.answer_cache.put(question, embedding, stream.answer, stream.metadata)
+        return stream.metadata
+    
+    def _generate_uncached(self, question: str):
+        """Stream the model's answer, bypassing the answer cache"""
+        system_prompt, user_prompt = self.build_prompts(question)
+        if self.rate_limiter is not None:
+            # Rough estimate (about 4 characters per token) plus the completion budget
+            self.rate_limiter.acquire((len(system_prompt) + len(user_prompt)) // 4 + self.MAX_TOKENS)
+        usage = None
+        try:
+            response = self._create_completion(
+                **self.request_body(system_prompt, user_prompt),
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            for chunk in response:
+                # The final chunk carries token usage and no choices
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            yield f"Error: {str(e)}"
+            return {"error": str(e)}
+        return self.build_metadata(system_prompt, user_prompt, usage)
+    
+    @retry(
+        retry=retry_if_exception_type((RateLimitError, APIConnectionError, InternalServerError)),
+        wait=_retry_wait,
+        stop=stop_after_attempt(MAX_RETRIES + 1) | stop_after_delay(RETRY_TIME_LIMIT),
+        reraise=True
+    )
+    def _create_completion(self, **body):
+        """Create a chat completion, retrying rate limits and transient errors
+        
+        Waits follow the 429's retry-after when there is one and stop after
+        RETRY_TIME_LIMIT seconds in total; the client's own retries are turned
+        off for this call so the two don't compound.
+        """
+        return self.client.with_options(max_retries=0).chat.completions.create(**body)
+    
+    def build_prompts(self, question: str) -> Tuple[str, str]:
+        """Build the (system, user) prompts for a question"""
         raise NotImplementedError
+    
+    def request_body(self, system_prompt: str, user_prompt: str) -> Dict:
+        """Chat completion parameters for a pair of prompts"""
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": 0.7,
+            "max_tokens": self.MAX_TOKENS
+        }
+    
+    def build_metadata(self, system_prompt: str, user_prompt: str, usage=None) -> Dict:
+        """Describe the approach and prompts behind an answer
+        
+        Token counts come from the API's usage report, when there is one.
+        """
+        metadata = {
+            **self.APPROACH,
+            "system_prompt": system_prompt,
+            "user_prompt": user_prompt,
+            "model": self.model
+        }
+        if usage is not None:
+            metadata["prompt_tokens"] = usage.prompt_tokens
+            metadata["completion_tokens"] = usage.completion_tokens
+        return metadata
+    
+    def embed(self, question: str):
+        """Unit-length embedding of a question, or None if it can't be computed"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(len(question) // 4 + 1)
+        try:
+            response = self.client.embeddings.create(model=EMBEDDING_MODEL, input=question)
+        except Exception as e:
+            print(f"Warning: Could not embed question, skipping answer cache: {e}")
+            return None
+        embedding = np.asarray(response.data[0].embedding, dtype=np.float32)
+        return embedding / np.linalg.norm(embedding)
 
 class BasicAnalyzer(SalesAnalyzer):
     """Analyzes sales data without ontology or knowledge graph"""
     
-    def __init__(self, api_key: str = None):
-        super().__init__(api_key)
+    MAX_TOKENS = 500
+    APPROACH = {
+        "approach": "Basic (No Ontology/KG)",
+        "data_source": "Raw CSV data",
+        "context_used": "Statistical summary + sample rows",
+        "semantic_understanding": "Limited - relies on column names only",
+        "reasoning_capability": "Basic - pattern matching in tabular data"
+    }
+    
+    def __init__(self, api_key: str = None, client: OpenAI = None, rate_limiter: RateLimiter = None):
+        super().__init__(api_key, client, rate_limiter)
         self.data = None
         self.load_data()
     
     def load_data(self):
         """Load raw sales data"""
         try:
-            df = pd.read_csv("data/sales_data.csv")
+            df = pd.read_parquet("data/sales_data.parquet")
             self.data = df
             
-            # Create basic summary statistics
+            # Create basic summary statistics in one aggregation pass
+            stats = df.agg({
+                'net_revenue': ['sum', 'mean'],
+                'date': ['min', 'max'],
+                'customer_id': 'nunique',
+                'product_id': 'nunique'
+            })
             self.summary = {
                 "total_records": len(df),
-                "total_revenue": df['net_revenue'].sum(),
-                "avg_revenue": df['net_revenue'].mean(),
-                "date_range": f"{df['date'].min()} to {df['date'].max()}",
-                "unique_customers": df['customer_id'].nunique(),
-                "unique_products": df['product_id'].nunique()
+                "total_revenue": stats.at['sum', 'net_revenue'],
+                "avg_revenue": stats.at['mean', 'net_revenue'],
+                "date_range": f"{stats.at['min', 'date']} to {stats.at['max', 'date']}",
+                # Mixed reductions come back as floats; counts stay integers
+                "unique_customers": int(stats.at['nunique', 'customer_id']),
+                "unique_products": int(stats.at['nunique', 'product_id'])
             }
         except Exception as e:
             print(f"Error loading data: {e}")
             self.data = None
+        self._data_context = self._build_data_context()
     
     def get_data_context(self, question: str) -> str:
-        """Get relevant data context for the question"""
+        """Get relevant data context for the question
+        
+        Like the enhanced analyzer's context, this doesn't depend on the
+        question, so it is built once when the data is loaded.
+        """
+        return self._data_context
+    
+    def _build_data_context(self) -> str:
+        """Format the summary statistics and sample rows into prompt context"""
         if self.data is None:
             return "No data available"
         
-        # Create a simple data summary
-        sample_data = self.data.head(10).to_string()
+        # Create a simple data summary (CSV is compact and much cheaper to format)
+        sample_data = self.data.head(10).to_csv(index=False)
         columns_info = ", ".join(self.data.columns)
         
         context = f"""
@@ -70,15 +362,14 @@ Sales Data Information:
 
 Available Columns: {columns_info}
 
-Sample Data (first 10 rows):
+Sample Data (first 10 rows, CSV):
 {sample_data}
-
 Note: This is raw tabular data without semantic relationships or domain knowledge.
 """
         return context
     
-    def analyze(self, question: str) -> Tuple[str, Dict]:
-        """Analyze question using basic approach"""
+    def build_prompts(self, question: str) -> Tuple[str, str]:
+        """Build the system and user prompts for the basic approach"""
         
         context = self.get_data_context(question)
         
@@ -94,71 +385,24 @@ Provide a clear, data-driven answer. If you need to calculate something, explain
 Keep your answer concise but informative.
 """
         
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
-            
-            answer = response.choices[0].message.content
-            
-            metadata = {
-                "approach": "Basic (No Ontology/KG)",
-                "data_source": "Raw CSV data",
-                "context_used": "Statistical summary + sample rows",
-                "semantic_understanding": "Limited - relies on column names only",
-                "reasoning_capability": "Basic - pattern matching in tabular data",
-                "system_prompt": system_prompt,
-                "user_prompt": user_prompt,
-                "prompt_tokens": len(system_prompt.split()) + len(user_prompt.split()),
-                "model": self.model
-            }
-            
-            return answer, metadata
-            
-        except Exception as e:
-            return f"Error: {str(e)}", {"error": str(e)}
+        return system_prompt, user_prompt
 
 class EnhancedAnalyzer(SalesAnalyzer):
     """Analyzes sales data using ontology and knowledge graph"""
     
-    def __init__(self, api_key: str = None):
-        super().__init__(api_key)
-        self.kg = None
-        self.load_knowledge_graph()
-    
-    def load_knowledge_graph(self):
-        """Load knowledge graph"""
-        try:
-            ontology = SalesOntology()
-            self.kg = KnowledgeGraphBuilder(ontology)
-            self.kg.load_sales_data()
-        except Exception as e:
-            print(f"Error loading knowledge graph: {e}")
-            self.kg = None
+    MAX_TOKENS = 600
+    APPROACH = {
+        "approach": "Enhanced (Ontology + Knowledge Graph)",
+        "data_source": "Semantic Knowledge Graph",
+        "context_used": "Domain ontology + semantic relationships + graph insights",
+        "semantic_understanding": "Deep - understands entity types, relationships, hierarchies",
+        "reasoning_capability": "Advanced - can make inferences and traverse relationships"
+    }
     
-    def get_semantic_context(self, question: str) -> str:
-        """Get semantic context from knowledge graph"""
-        if self.kg is None:
-            return "Knowledge graph not available"
-        
-        try:
-            # Get insights from KG
-            insights = self.kg.get_insights()
-            
-            # Get reasoning insights for causal analysis
-            reasoning = self.kg.get_reasoning_insights()
-        except Exception as e:
-            print(f"Warning: Error getting insights: {e}")
-            return "Knowledge graph available but insights could not be generated."
-        
-        # Get ontology structure
-        ontology_info = """
+    # Static parts of the prompt, the same for every question. They go in
+    # the system prompt, which keeps the prefix stable for prompt caching and
+    # leaves only the graph insights and the question in the user prompt.
+    ONTOLOGY_INFO = """
 Domain Ontology Structure:
 - Classes: Sale, Customer (Enterprise/SMB/MidMarket), Product (Electronics/Furniture), 
            SalesRepresentative, Region, Category, Industry
@@ -181,52 +425,29 @@ Domain Ontology Structure:
   * Premium products attract enterprise customers (WHY: budget availability, quality needs)
   * Experience impacts sales effectiveness (WHY: expertise, relationships, credibility)
 """
-        
-        # Format insights
-        insights_text = f"""
-Knowledge Graph Insights:
-
-Revenue by Region:
-"""
-        for item in insights.get('revenue_by_region', []):
-            insights_text += f"  • {item['region']}: ${item['revenue']:,.2f} from {item['sales']} sales\n"
-        
-        insights_text += "\nTop Products:\n"
-        for item in insights.get('top_products', [])[:5]:
-            insights_text += f"  • {item['product']}: ${item['revenue']:,.2f} ({item['units_sold']} units)\n"
-        
-        insights_text += "\nRevenue by Customer Segment:\n"
-        for item in insights.get('revenue_by_customer_type', []):
-            insights_text += f"  • {item['customer_type']}: ${item['total_revenue']:,.2f} (avg deal: ${item['avg_revenue']:,.2f})\n"
-        
-        # Add reasoning insights for WHY questions
-        reasoning_text = """
-REASONING & CAUSAL INSIGHTS (for WHY questions):
+    
+    # Common query patterns
+    SPARQL_TEMPLATES = """
+Available SPARQL Query Patterns:
 
-1. Product-Customer Affinity (Why certain products sell more to specific customers):
+1. Revenue by dimension:
+   SELECT ?dimension (SUM(?revenue) as ?total)
+   WHERE { ?sale sales:soldTo/sales:locatedIn/sales:regionName ?dimension }
+   
+2. Top performers:
+   SELECT ?name (SUM(?revenue) as ?total)
+   ORDER BY DESC(?total) LIMIT N
+   
+3. Customer insights:
+   SELECT ?customer ?type ?industry
+   WHERE { ?customer a sales:Customer }
+   
+4. Product relationships:
+   SELECT ?product ?category ?subcategory
+   WHERE { ?product sales:belongsToCategory ?cat }
 """
-        for item in reasoning.get('product_customer_fit', [])[:5]:
-            reasoning_text += f"   • {item['product']} → {item['customer_type']}: {item['sales_count']} sales, ${item['avg_deal']:,.2f} avg\n"
-            reasoning_text += f"     WHY: {item['category']} products fit {item['customer_type']} needs and budgets\n"
-        
-        reasoning_text += "\n2. Regional Performance Patterns (Why regions differ):\n"
-        for item in reasoning.get('regional_patterns', [])[:5]:
-            reasoning_text += f"   • {item['region']} + {item['industry']} → {item['product']}: {item['sales_count']} sales\n"
-            reasoning_text += f"     WHY: Industry-Product fit + regional market characteristics\n"
-        
-        reasoning_text += "\n3. Sales Rep Effectiveness (Why some reps perform better):\n"
-        for item in reasoning.get('rep_effectiveness', [])[:3]:
-            reasoning_text += f"   • {item['rep']} ({item['experience']}y exp, {item['region']}): ${item['avg_deal']:,.2f} avg deal\n"
-            reasoning_text += f"     WHY: Experience + regional knowledge + customer relationships\n"
-        
-        reasoning_text += "\n4. Discount Impact Patterns (Why discounts work differently):\n"
-        for item in reasoning.get('discount_patterns', []):
-            reasoning_text += f"   • {item['customer_type']}: {item['avg_discount']:.1f}% avg discount → ${item['avg_revenue']:,.2f} deals\n"
-            reasoning_text += f"     WHY: Different price sensitivity and volume leverage\n"
-        
-        context = ontology_info + insights_text + reasoning_text
-        
-        context += """
+    
+    REASONING_GUIDE = """
 Enhanced Capabilities with REASONING:
 - Semantic relationships between entities are explicitly modeled
 - Domain knowledge is encoded in the ontology
@@ -243,51 +464,143 @@ When answering WHY questions:
 4. Explain patterns using semantic understanding (not just correlations)
 5. Provide actionable insights based on causal reasoning
 """
+    
+    SYSTEM_PROMPT = f"""You are an advanced sales intelligence system with semantic 
+understanding of the sales domain through ontology and knowledge graphs. You can reason about 
+relationships, hierarchies, and domain concepts.
+{ONTOLOGY_INFO}{SPARQL_TEMPLATES}{REASONING_GUIDE}"""
+    
+    # Entries kept per insight list; the lists are ranked, so these are the top ones
+    INSIGHT_LIMIT = 3
+    
+    # (insight list, section header, line format) for each part of the context
+    INSIGHT_SECTIONS = (
+        ('revenue_by_region', "\nRevenue by Region:\n",
+         "  • {region}: ${revenue:,.2f} from {sales} sales\n"),
+        ('top_products', "\nTop Products:\n",
+         "  • {product}: ${revenue:,.2f} ({units_sold} units)\n"),
+        ('revenue_by_customer_type', "\nRevenue by Customer Segment:\n",
+         "  • {customer_type}: ${total_revenue:,.2f} (avg deal: ${avg_revenue:,.2f})\n"),
+    )
+    REASONING_SECTIONS = (
+        ('product_customer_fit',
+         "\n1. Product-Customer Affinity (Why certain products sell more to specific customers):\n",
+         "   • {product} → {customer_type}: {sales_count} sales, ${avg_deal:,.2f} avg\n"
+         "     WHY: {category} products fit {customer_type} needs and budgets\n"),
+        ('regional_patterns', "\n2. Regional Performance Patterns (Why regions differ):\n",
+         "   • {region} + {industry} → {product}: {sales_count} sales\n"
+         "     WHY: Industry-Product fit + regional market characteristics\n"),
+        ('rep_effectiveness', "\n3. Sales Rep Effectiveness (Why some reps perform better):\n",
+         "   • {rep} ({experience}y exp, {region}): ${avg_deal:,.2f} avg deal\n"
+         "     WHY: Experience + regional knowledge + customer relationships\n"),
+        ('discount_patterns', "\n4. Discount Impact Patterns (Why discounts work differently):\n",
+         "   • {customer_type}: {avg_discount:.1f}% avg discount → ${avg_revenue:,.2f} deals\n"
+         "     WHY: Different price sensitivity and volume leverage\n"),
+    )
+    
+    def __init__(self, api_key: str = None, client: OpenAI = None, kg: KnowledgeGraphBuilder = None,
+                 rate_limiter: RateLimiter = None):
+        super().__init__(api_key, client, rate_limiter)
+        self._kg = kg
+        self._kg_loaded = kg is not None
+        self._semantic_context = None
+        self._kg_lock = threading.Lock()
+    
+    @property
+    def kg(self) -> KnowledgeGraphBuilder:
+        """Knowledge graph, loaded on first use unless one was passed in"""
+        with self._kg_lock:
+            if not self._kg_loaded:
+                self.load_knowledge_graph()
+            return self._kg
+    
+    def prewarm(self):
+        """Build the semantic context now rather than for the first question
         
-        return context
+        Callers that always need both analyzers can overlap this with other
+        start-up work.
+        """
+        with self._kg_lock:
+            if self._semantic_context is None:
+                self._semantic_context = self._build_semantic_context()
     
-    def generate_sparql_if_needed(self, question: str) -> str:
-        """Generate SPARQL query if question requires specific data"""
+    def load_knowledge_graph(self):
+        """Load knowledge graph"""
+        self._kg_loaded = True
+        try:
+            # The ontology build and the sales data read are independent
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                sales = pool.submit(read_sales_data)
+                ontology = SalesOntology()
+                df = sales.result()
+            self._kg = KnowledgeGraphBuilder(ontology)
+            self._kg.load_sales_data(df=df)
+        except Exception as e:
+            print(f"Error loading knowledge graph: {e}")
+            self._kg = None
+    
+    def get_semantic_context(self, question: str) -> str:
+        """Get semantic context from knowledge graph
         
-        # Common query patterns
-        sparql_templates = """
-Available SPARQL Query Patterns:
-
-1. Revenue by dimension:
-   SELECT ?dimension (SUM(?revenue) as ?total)
-   WHERE { ?sale sales:soldTo/sales:locatedIn/sales:regionName ?dimension }
-   
-2. Top performers:
-   SELECT ?name (SUM(?revenue) as ?total)
-   ORDER BY DESC(?total) LIMIT N
-   
-3. Customer insights:
-   SELECT ?customer ?type ?industry
-   WHERE { ?customer a sales:Customer }
-   
-4. Product relationships:
-   SELECT ?product ?category ?subcategory
-   WHERE { ?product sales:belongsToCategory ?cat }
-"""
-        return sparql_templates
+        The context doesn't depend on the question, so it is built once and
+        reused for every question.
+        """
+        if self._semantic_context is None:
+            self.prewarm()
+        return self._semantic_context
     
-    def analyze(self, question: str) -> Tuple[str, Dict]:
-        """Analyze question using enhanced approach with KG"""
+    def _build_semantic_context(self) -> str:
+        """Format graph insights into prompt context
         
-        semantic_context = self.get_semantic_context(question)
-        sparql_info = self.generate_sparql_if_needed(question)
+        Without a graph passed in, insights precomputed by setup.py are used
+        when they are up to date, so the graph is never built at all.
+        """
+        saved = None if self._kg_loaded else load_insights()
+        if saved is not None:
+            insights, reasoning = saved["insights"], saved["reasoning"]
+        else:
+            if not self._kg_loaded:
+                self.load_knowledge_graph()
+            if self._kg is None:
+                return "Knowledge graph not available"
+            
+            try:
+                # Get insights from KG
+                insights = self._kg.get_insights()
+                
+                # Get reasoning insights for causal analysis
+                reasoning = self._kg.get_reasoning_insights()
+            except Exception as e:
+                print(f"Warning: Error getting insights: {e}")
+                return "Knowledge graph available but insights could not be generated."
         
-        system_prompt = """You are an advanced sales intelligence system with semantic 
-understanding of the sales domain through ontology and knowledge graphs. You can reason about 
-relationships, hierarchies, and domain concepts."""
+        
+        # Format insights and add reasoning insights for WHY questions
+        insights_text = "\nKnowledge Graph Insights:\n" + self._format_sections(insights, self.INSIGHT_SECTIONS)
+        reasoning_text = (
+            "\nREASONING & CAUSAL INSIGHTS (for WHY questions):\n"
+            + self._format_sections(reasoning, self.REASONING_SECTIONS)
+        )
+        
+        return insights_text + reasoning_text
+    
+    def _format_sections(self, data: Dict, sections) -> str:
+        """Format the top entries of each insight list, skipping empty ones"""
+        parts = []
+        for key, header, line in sections:
+            items = data.get(key, [])[:self.INSIGHT_LIMIT]
+            if items:
+                parts.append(header + "".join(map(line.format_map, items)))
+        return "".join(parts)
+    
+    def build_prompts(self, question: str) -> Tuple[str, str]:
+        """Build the system and user prompts for the enhanced approach with KG"""
+        
+        semantic_context = self.get_semantic_context(question)
         
         user_prompt = f"""You are an advanced sales intelligence analyst with access to a semantic knowledge graph 
 and domain ontology. You understand not just the data, but the relationships and meaning behind it.
-
 {semantic_context}
-
-{sparql_info}
-
 Question: {question}
 
 Provide a comprehensive, insight-driven answer that:
@@ -299,61 +612,169 @@ Provide a comprehensive, insight-driven answer that:
 Your answer should demonstrate understanding beyond simple data aggregation.
 """
         
+        return self.SYSTEM_PROMPT, user_prompt
+
+class AnalyzerPair:
+    """Basic and enhanced analyzers sharing a single OpenAI client
+    
+    Chat completions cannot carry two independent conversations in one
+    request, so both prompts go out over the same client instead: the
+    requests share its connection pool and run concurrently.
+    """
+    
+    def __init__(self, api_key: str = None, kg: KnowledgeGraphBuilder = None):
+        if api_key is None:
+            api_key = os.getenv("OPENAI_API_KEY")
+        self.client = client = OpenAI(api_key=api_key, max_retries=MAX_RETRIES)
+        rate_limiter = RateLimiter.from_env()
+        self.enhanced = EnhancedAnalyzer(api_key, client=client, kg=kg, rate_limiter=rate_limiter)
+        # Both analyzers are always needed: build the knowledge graph side
+        # while the basic analyzer reads the sales data
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            prewarm = pool.submit(self.enhanced.prewarm)
+            self.basic = BasicAnalyzer(api_key, client=client, rate_limiter=rate_limiter)
+            prewarm.result()
+    
+    def embed(self, question: str):
+        """Embed a question once for both analyzers' answer caches"""
+        return self.basic.embed(question)
+    
+    def analyze_pair(self, question: str, executor: Executor = None) -> Tuple[Tuple[str, Dict], Tuple[str, Dict]]:
+        """Answer a question with both approaches, returning (basic, enhanced) results"""
+        if executor is None:
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                return self.analyze_pair(question, pool)
+        
+        embedding = self.embed(question)
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=600
-            )
-            
-            answer = response.choices[0].message.content
-            
-            metadata = {
-                "approach": "Enhanced (Ontology + Knowledge Graph)",
-                "data_source": "Semantic Knowledge Graph",
-                "context_used": "Domain ontology + semantic relationships + graph insights",
-                "semantic_understanding": "Deep - understands entity types, relationships, hierarchies",
-                "reasoning_capability": "Advanced - can make inferences and traverse relationships",
-                "system_prompt": system_prompt,
-                "user_prompt": user_prompt,
-                "prompt_tokens": len(system_prompt.split()) + len(user_prompt.split()),
-                "model": self.model
-            }
-            
-            return answer, metadata
-            
-        except Exception as e:
-            return f"Error: {str(e)}", {"error": str(e)}
+            basic_future = executor.submit(self.basic.analyze, question, embedding)
+            enhanced_future = executor.submit(self.enhanced.analyze, question, embedding)
+            return basic_future.result(), enhanced_future.result()
+        except RuntimeError as e:
+            # Executor unavailable (e.g. shut down during a reload): run sequentially
+            print(f"Falling back to sequential analysis: {e}")
+            return self.basic.analyze(question, embedding), self.enhanced.analyze(question, embedding)
+
+@lru_cache(maxsize=1)
+def _get_analyzer_pair(api_key: str = None) -> AnalyzerPair:
+    """Analyzers reused across compare_approaches calls, so the sales data
+    and knowledge graph are loaded once rather than per question"""
+    return AnalyzerPair(api_key)
 
 def compare_approaches(question: str, api_key: str = None) -> Dict:
-    """Compare both approaches for the same question"""
-    
-    basic = BasicAnalyzer(api_key)
-    enhanced = EnhancedAnalyzer(api_key)
-    
-    basic_answer, basic_meta = basic.analyze(question)
-    enhanced_answer, enhanced_meta = enhanced.analyze(question)
-    
-    return {
-        "question": question,
-        "basic": {
-            "answer": basic_answer,
-            "metadata": basic_meta
-        },
-        "enhanced": {
-            "answer": enhanced_answer,
-            "metadata": enhanced_meta
-        }
-    }
+    """Compare both approaches for the same question
+    
+    The basic and enhanced requests are in flight at the same time, so the
+    wall-clock cost is the slower of the two round-trips, not their sum.
+    """
+    return compare_approaches_many([question], api_key)[0]
+
+def compare_approaches_many(questions: List[str], api_key: str = None, max_workers: int = 6) -> List[Dict]:
+    """Compare both approaches for several questions at once
+    
+    Every request is queued on one thread pool, so throughput is bounded by
+    the configured rate limits rather than by sequential round-trips.
+    """
+    pair = _get_analyzer_pair(api_key)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # One embedding per question, shared by both analyzers
+        embeddings = list(executor.map(pair.embed, questions))
+        futures = [
+            (question,
+             executor.submit(pair.basic.analyze, question, embedding),
+             executor.submit(pair.enhanced.analyze, question, embedding))
+            for question, embedding in zip(questions, embeddings)
+        ]
+        results = []
+        for question, basic_future, enhanced_future in futures:
+            (basic_answer, basic_meta), (enhanced_answer, enhanced_meta) = basic_future.result(), enhanced_future.result()
+            results.append({
+                "question": question,
+                "basic": {
+                    "answer": basic_answer,
+                    "metadata": basic_meta
+                },
+                "enhanced": {
+                    "answer": enhanced_answer,
+                    "metadata": enhanced_meta
+                }
+            })
+    return results
+
+def compare_approaches_batch(questions: List[str], api_key: str = None, poll_interval: float = 30) -> List[Dict]:
+    """Compare both approaches for many questions through the OpenAI Batch API
+    
+    All prompts go up as one JSONL file and are answered server-side at half
+    the cost, but a batch can take up to 24 hours: use this for offline
+    sweeps, not interactive questions. Returns one compare_approaches-style
+    result per question.
+    """
+    pair = _get_analyzer_pair(api_key)
+    analyzers = {"basic": pair.basic, "enhanced": pair.enhanced}
+    
+    prompts = {}
+    lines = []
+    for i, question in enumerate(questions):
+        for name, analyzer in analyzers.items():
+            custom_id = f"{i}-{name}"
+            prompts[custom_id] = analyzer.build_prompts(question)
+            lines.append(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": analyzer.request_body(*prompts[custom_id])
+            }))
+    
+    batch_input = pair.client.files.create(
+        file=("questions.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch"
+    )
+    batch = pair.client.batches.create(
+        input_file_id=batch_input.id, endpoint="/v1/chat/completions", completion_window="24h"
+    )
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        time.sleep(poll_interval)
+        batch = pair.client.batches.retrieve(batch.id)
+    
+    # Output lines come back in any order; match them up by custom_id
+    answers = {}
+    if batch.output_file_id:
+        for line in pair.client.files.content(batch.output_file_id).text.splitlines():
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") == 200:
+                body = response["body"]
+                answers[record["custom_id"]] = (body["choices"][0]["message"]["content"], body.get("usage"))
+    
+    results = []
+    for i, question in enumerate(questions):
+        result = {"question": question}
+        for name, analyzer in analyzers.items():
+            custom_id = f"{i}-{name}"
+            if custom_id in answers:
+                answer, usage = answers[custom_id]
+                result[name] = {
+                    "answer": answer,
+                    "metadata": analyzer.build_metadata(
+                        *prompts[custom_id], SimpleNamespace(**usage) if usage else None
+                    )
+                }
+            else:
+                error = f"No answer in batch {batch.id} (status: {batch.status})"
+                result[name] = {"answer": f"Error: {error}", "metadata": {"error": error}}
+        results.append(result)
+    
+    return results
 
 if __name__ == "__main__":
+    import argparse
     from dotenv import load_dotenv
     load_dotenv()
     
+    parser = argparse.ArgumentParser(description="Compare basic and enhanced answers")
+    parser.add_argument("--batch", action="store_true",
+                        help="submit all questions as one Batch API job (half the cost, may take hours)")
+    args = parser.parse_args()
+    
     # Test questions
     questions = [
         "Which region has the highest revenue?",
@@ -361,13 +782,16 @@ if __name__ == "__main__":
         "How does customer type affect purchase patterns?"
     ]
     
-    for question in questions:
+    if args.batch:
+        results = compare_approaches_batch(questions)
+    else:
+        results = compare_approaches_many(questions)
+    
+    for result in results:
         print(f"\n{'='*80}")
-        print(f"Question: {question}")
+        print(f"Question: {result['question']}")
         print('='*80)
         
-        result = compare_approaches(question)
-        
         print("\n--- BASIC APPROACH (No Ontology) ---")
         print(result['basic']['answer'])
         
@@ -4,19 +4,99 @@ This module defines the ontology for the sales domain using RDF/OWL
 """
 from rdflib import Graph, Namespace, Literal, URIRef
 from rdflib.namespace import RDF, RDFS, OWL, XSD
+from functools import cached_property
+import hashlib
 import json
+import os
+
+# Core classes: (name, description)
+CLASSES = (
+    ("Sale", "A sales transaction"),
+    ("Customer", "A customer entity"),
+    ("Product", "A product or service"),
+    ("SalesRepresentative", "A sales team member"),
+    ("Region", "Geographical region"),
+    ("Category", "Product category"),
+    ("Industry", "Customer industry sector"),
+)
+
+# Subclasses: (subclass, parent class)
+SUBCLASSES = (
+    ("EnterpriseCustomer", "Customer"),
+    ("SMBCustomer", "Customer"),
+    ("MidMarketCustomer", "Customer"),
+    ("ElectronicsProduct", "Product"),
+    ("FurnitureProduct", "Product"),
+)
+
+# Object properties (relationships between entities): (name, domain, range, description)
+OBJECT_PROPERTIES = (
+    ("soldTo", "Sale", "Customer", "Links a sale to a customer"),
+    ("soldBy", "Sale", "SalesRepresentative", "Links a sale to the sales rep"),
+    ("productSold", "Sale", "Product", "Links a sale to the product"),
+    ("locatedIn", "Customer", "Region", "Customer's geographical location"),
+    ("operatesIn", "SalesRepresentative", "Region", "Region where sales rep operates"),
+    ("belongsToCategory", "Product", "Category", "Product's category"),
+    ("belongsToIndustry", "Customer", "Industry", "Customer's industry"),
+    ("hasSubcategory", "Category", "Category", "Hierarchical category relationship"),
+)
+
+# Data properties (attributes): (name, domain, XSD range, description)
+DATA_PROPERTIES = (
+    ("saleId", "Sale", XSD.string, "Unique sale identifier"),
+    ("saleDate", "Sale", XSD.date, "Date of sale"),
+    ("quantity", "Sale", XSD.integer, "Quantity sold"),
+    ("grossRevenue", "Sale", XSD.decimal, "Revenue before discount"),
+    ("netRevenue", "Sale", XSD.decimal, "Revenue after discount"),
+    ("discountPercentage", "Sale", XSD.decimal, "Discount applied"),
+    ("status", "Sale", XSD.string, "Sale status"),
+    ("customerId", "Customer", XSD.string, "Customer identifier"),
+    ("customerName", "Customer", XSD.string, "Customer name"),
+    ("customerType", "Customer", XSD.string, "Customer business size"),
+    ("productId", "Product", XSD.string, "Product identifier"),
+    ("productName", "Product", XSD.string, "Product name"),
+    ("unitPrice", "Product", XSD.decimal, "Product unit price"),
+    ("repId", "SalesRepresentative", XSD.string, "Sales rep identifier"),
+    ("repName", "SalesRepresentative", XSD.string, "Sales rep name"),
+    ("experienceYears", "SalesRepresentative", XSD.integer, "Years of experience"),
+    ("regionName", "Region", XSD.string, "Region name"),
+    ("categoryName", "Category", XSD.string, "Category name"),
+    ("industryName", "Industry", XSD.string, "Industry name"),
+)
+
+# Reasoning concepts: (name, description)
+REASONING_CONCEPTS = (
+    ("HighValueCustomer", "Customer with average deal size > $5000"),
+    ("FrequentBuyer", "Customer with multiple purchases"),
+    ("PremiumProduct", "Product with price > $400"),
+    ("BudgetProduct", "Product with price < $100"),
+    ("ExperiencedRep", "Sales rep with > 5 years experience"),
+    ("SeasonalPattern", "Sales influenced by time period"),
+    ("RegionalPreference", "Product-Region affinity pattern"),
+    ("IndustryFit", "Product-Industry compatibility"),
+    ("DiscountSensitive", "Customer segment responding to discounts"),
+)
+
+# Causal relationship properties: (name, description)
+CAUSAL_PROPERTIES = (
+    ("causedBy", "Indicates causal relationship"),
+    ("influences", "Indicates influence factor"),
+    ("correlatesWith", "Indicates correlation"),
+    ("indicatesPreference", "Shows preference pattern"),
+)
 
 class SalesOntology:
     """Define and manage the Sales domain ontology"""
     
     def __init__(self):
-        self.graph = Graph()
+        # Triples indexed subject -> predicate -> objects. The ontology is
+        # small and static, so an rdflib Graph is only built when needed.
+        self.spo = {}
+        # rdf:type objects -> subjects, so typed lookups skip other triples
+        self.instances = {}
         
         # Define namespaces
         self.SALES = Namespace("http://example.org/sales#")
-        self.graph.bind("sales", self.SALES)
-        self.graph.bind("owl", OWL)
-        self.graph.bind("rdfs", RDFS)
         
         # Build the ontology
         self._define_classes()
@@ -24,161 +104,128 @@ class SalesOntology:
         self._define_axioms()
         self._define_reasoning_rules()
     
+    def _add(self, triple):
+        """Add a (subject, predicate, object) triple to the ontology"""
+        s, p, o = triple
+        self.spo.setdefault(s, {}).setdefault(p, set()).add(o)
+        if p == RDF.type:
+            self.instances.setdefault(o, set()).add(s)
+    
+    def triples(self):
+        """Iterate over every triple in the ontology"""
+        for s, predicates in self.spo.items():
+            for p, objects in predicates.items():
+                for o in objects:
+                    yield s, p, o
+    
+    @cached_property
+    def graph(self) -> Graph:
+        """The ontology as an rdflib Graph, built on first use"""
+        graph = Graph()
+        graph.bind("sales", self.SALES)
+        graph.bind("owl", OWL)
+        graph.bind("rdfs", RDFS)
+        graph.addN((s, p, o, graph) for s, p, o in self.triples())
+        return graph
+    
     def _define_classes(self):
         """Define the main classes in our ontology"""
         
-        # Core classes
-        classes = {
-            "Sale": "A sales transaction",
-            "Customer": "A customer entity",
-            "Product": "A product or service",
-            "SalesRepresentative": "A sales team member",
-            "Region": "Geographical region",
-            "Category": "Product category",
-            "Industry": "Customer industry sector"
-        }
-        
-        for class_name, description in classes.items():
+        for class_name, description in CLASSES:
             class_uri = self.SALES[class_name]
-            self.graph.add((class_uri, RDF.type, OWL.Class))
-            self.graph.add((class_uri, RDFS.label, Literal(class_name)))
-            self.graph.add((class_uri, RDFS.comment, Literal(description)))
-        
-        # Subclasses
-        self.graph.add((self.SALES.EnterpriseCustomer, RDFS.subClassOf, self.SALES.Customer))
-        self.graph.add((self.SALES.SMBCustomer, RDFS.subClassOf, self.SALES.Customer))
-        self.graph.add((self.SALES.MidMarketCustomer, RDFS.subClassOf, self.SALES.Customer))
+            self._add((class_uri, RDF.type, OWL.Class))
+            self._add((class_uri, RDFS.label, Literal(class_name)))
+            self._add((class_uri, RDFS.comment, Literal(description)))
         
-        self.graph.add((self.SALES.ElectronicsProduct, RDFS.subClassOf, self.SALES.Product))
-        self.graph.add((self.SALES.FurnitureProduct, RDFS.subClassOf, self.SALES.Product))
+        for subclass, parent in SUBCLASSES:
+            self._add((self.SALES[subclass], RDFS.subClassOf, self.SALES[parent]))
     
     def _define_properties(self):
         """Define object and data properties"""
         
-        # Object Properties (relationships between entities)
-        object_properties = {
-            "soldTo": ("Sale", "Customer", "Links a sale to a customer"),
-            "soldBy": ("Sale", "SalesRepresentative", "Links a sale to the sales rep"),
-            "productSold": ("Sale", "Product", "Links a sale to the product"),
-            "locatedIn": ("Customer", "Region", "Customer's geographical location"),
-            "operatesIn": ("SalesRepresentative", "Region", "Region where sales rep operates"),
-            "belongsToCategory": ("Product", "Category", "Product's category"),
-            "belongsToIndustry": ("Customer", "Industry", "Customer's industry"),
-            "hasSubcategory": ("Category", "Category", "Hierarchical category relationship"),
-        }
-        
-        for prop_name, (domain, range_class, description) in object_properties.items():
+        for prop_name, domain, range_class, description in OBJECT_PROPERTIES:
             prop_uri = self.SALES[prop_name]
-            self.graph.add((prop_uri, RDF.type, OWL.ObjectProperty))
-            self.graph.add((prop_uri, RDFS.domain, self.SALES[domain]))
-            self.graph.add((prop_uri, RDFS.range, self.SALES[range_class]))
-            self.graph.add((prop_uri, RDFS.comment, Literal(description)))
-        
-        # Data Properties (attributes)
-        data_properties = {
-            "saleId": ("Sale", XSD.string, "Unique sale identifier"),
-            "saleDate": ("Sale", XSD.date, "Date of sale"),
-            "quantity": ("Sale", XSD.integer, "Quantity sold"),
-            "grossRevenue": ("Sale", XSD.decimal, "Revenue before discount"),
-            "netRevenue": ("Sale", XSD.decimal, "Revenue after discount"),
-            "discountPercentage": ("Sale", XSD.decimal, "Discount applied"),
-            "status": ("Sale", XSD.string, "Sale status"),
-            
-            "customerId": ("Customer", XSD.string, "Customer identifier"),
-            "customerName": ("Customer", XSD.string, "Customer name"),
-            "customerType": ("Customer", XSD.string, "Customer business size"),
-            
-            "productId": ("Product", XSD.string, "Product identifier"),
-            "productName": ("Product", XSD.string, "Product name"),
-            "unitPrice": ("Product", XSD.decimal, "Product unit price"),
-            
-            "repId": ("SalesRepresentative", XSD.string, "Sales rep identifier"),
-            "repName": ("SalesRepresentative", XSD.string, "Sales rep name"),
-            "experienceYears": ("SalesRepresentative", XSD.integer, "Years of experience"),
-            
-            "regionName": ("Region", XSD.string, "Region name"),
-            "categoryName": ("Category", XSD.string, "Category name"),
-            "industryName": ("Industry", XSD.string, "Industry name"),
-        }
+            self._add((prop_uri, RDF.type, OWL.ObjectProperty))
+            self._add((prop_uri, RDFS.domain, self.SALES[domain]))
+            self._add((prop_uri, RDFS.range, self.SALES[range_class]))
+            self._add((prop_uri, RDFS.comment, Literal(description)))
         
-        for prop_name, (domain, range_type, description) in data_properties.items():
+        for prop_name, domain, range_type, description in DATA_PROPERTIES:
             prop_uri = self.SALES[prop_name]
-            self.graph.add((prop_uri, RDF.type, OWL.DatatypeProperty))
-            self.graph.add((prop_uri, RDFS.domain, self.SALES[domain]))
-            self.graph.add((prop_uri, RDFS.range, range_type))
-            self.graph.add((prop_uri, RDFS.comment, Literal(description)))
+            self._add((prop_uri, RDF.type, OWL.DatatypeProperty))
+            self._add((prop_uri, RDFS.domain, self.SALES[domain]))
+            self._add((prop_uri, RDFS.range, range_type))
+            self._add((prop_uri, RDFS.comment, Literal(description)))
     
     def _define_axioms(self):
         """Define logical axioms and constraints"""
         
         # Inverse properties
-        self.graph.add((self.SALES.soldTo, OWL.inverseOf, self.SALES.hasPurchase))
-        self.graph.add((self.SALES.soldBy, OWL.inverseOf, self.SALES.madeSale))
+        self._add((self.SALES.soldTo, OWL.inverseOf, self.SALES.hasPurchase))
+        self._add((self.SALES.soldBy, OWL.inverseOf, self.SALES.madeSale))
         
         # Functional properties (single value)
-        self.graph.add((self.SALES.saleDate, RDF.type, OWL.FunctionalProperty))
-        self.graph.add((self.SALES.saleId, RDF.type, OWL.FunctionalProperty))
+        self._add((self.SALES.saleDate, RDF.type, OWL.FunctionalProperty))
+        self._add((self.SALES.saleId, RDF.type, OWL.FunctionalProperty))
     
     def _define_reasoning_rules(self):
         """Define reasoning rules for causal and diagnostic analysis"""
         
-        # Define reasoning concepts
-        rules = {
-            "HighValueCustomer": "Customer with average deal size > $5000",
-            "FrequentBuyer": "Customer with multiple purchases",
-            "PremiumProduct": "Product with price > $400",
-            "BudgetProduct": "Product with price < $100",
-            "ExperiencedRep": "Sales rep with > 5 years experience",
-            "SeasonalPattern": "Sales influenced by time period",
-            "RegionalPreference": "Product-Region affinity pattern",
-            "IndustryFit": "Product-Industry compatibility",
-            "DiscountSensitive": "Customer segment responding to discounts",
-        }
-        
-        for concept, description in rules.items():
+        for concept, description in REASONING_CONCEPTS:
             concept_uri = self.SALES[concept]
-            self.graph.add((concept_uri, RDF.type, OWL.Class))
-            self.graph.add((concept_uri, RDFS.comment, Literal(description)))
+            self._add((concept_uri, RDF.type, OWL.Class))
+            self._add((concept_uri, RDFS.comment, Literal(description)))
         
-        # Causal relationship properties
-        causal_props = {
-            "causedBy": "Indicates causal relationship",
-            "influences": "Indicates influence factor",
-            "correlatesWith": "Indicates correlation",
-            "indicatesPreference": "Shows preference pattern",
-        }
-        
-        for prop, desc in causal_props.items():
+        for prop, desc in CAUSAL_PROPERTIES:
             prop_uri = self.SALES[prop]
-            self.graph.add((prop_uri, RDF.type, OWL.ObjectProperty))
-            self.graph.add((prop_uri, RDFS.comment, Literal(desc)))
+            self._add((prop_uri, RDF.type, OWL.ObjectProperty))
+            self._add((prop_uri, RDFS.comment, Literal(desc)))
+    
+    def digest(self):
+        """SHA-256 of the ontology's triples, independent of their order"""
+        lines = sorted(" ".join(term.n3() for term in triple) for triple in self.triples())
+        return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
     
     def save(self, filepath="data/sales_ontology.ttl"):
-        """Save ontology to file"""
+        """Save ontology to file
+        
+        The ontology only changes with the code, so serialization is skipped
+        when the file was written from identical triples (recorded in a
+        .sha256 file alongside it).
+        """
+        digest = self.digest()
+        digest_path = filepath + ".sha256"
+        try:
+            with open(digest_path, 'r') as f:
+                unchanged = f.read().strip() == digest and os.path.exists(filepath)
+        except OSError:
+            unchanged = False
+        if unchanged:
+            print(f"Ontology unchanged, keeping {filepath}")
+            return
+        
         self.graph.serialize(destination=filepath, format="turtle")
+        with open(digest_path, 'w') as f:
+            f.write(digest + "\n")
         print(f"Ontology saved to {filepath}")
     
     def get_ontology_summary(self):
         """Get a summary of the ontology"""
-        classes = set()
-        properties = set()
-        
-        for s, p, o in self.graph:
-            if p == RDF.type:
-                if o == OWL.Class:
-                    classes.add(str(s).split("#")[-1])
-                elif o in [OWL.ObjectProperty, OWL.DatatypeProperty]:
-                    properties.add(str(s).split("#")[-1])
+        classes = {str(s).split("#")[-1] for s in self.instances.get(OWL.Class, ())}
+        properties = {
+            str(s).split("#")[-1]
+            for prop_type in (OWL.ObjectProperty, OWL.DatatypeProperty)
+            for s in self.instances.get(prop_type, ())
+        }
         
         return {
             "classes": sorted(classes),
             "properties": sorted(properties),
-            "total_triples": len(self.graph)
+            "total_triples": sum(len(objects) for predicates in self.spo.values() for objects in predicates.values())
         }
 
 def create_ontology():
     """Create and save the sales ontology"""
-    import os
     os.makedirs("data", exist_ok=True)
     
     ontology = SalesOntology()
@@ -4,6 +4,14 @@ Run this to set up data, ontology, and knowledge graph
 """
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+
+def _stat_or_none(filepath):
+    """os.stat result for a file, or None if it doesn't exist"""
+    try:
+        return os.stat(filepath)
+    except FileNotFoundError:
+        return None
 
 def setup_demo():
     """Run all setup steps"""
@@ -82,17 +90,22 @@ def setup_demo():
     # Verify files
     print("\n6️⃣  Verifying setup...")
     required_files = [
-        "data/sales_data.csv",
+        "data/sales_data.parquet",
         "data/metadata.json",
         "data/sales_ontology.ttl",
-        "data/knowledge_graph.ttl"
+        "data/knowledge_graph.ttl",
+        "data/kg_insights.json"
     ]
     
+    # Stat the files concurrently: on network-mounted data/ directories
+    # each call is a round-trip
+    with ThreadPoolExecutor(max_workers=len(required_files)) as pool:
+        stats = list(pool.map(_stat_or_none, required_files))
+    
     all_good = True
-    for filepath in required_files:
-        if os.path.exists(filepath):
-            size = os.path.getsize(filepath)
-            print(f"   ✅ {filepath} ({size:,} bytes)")
+    for filepath, stat in zip(required_files, stats):
+        if stat is not None:
+            print(f"   ✅ {filepath} ({stat.st_size:,} bytes)")
         else:
             print(f"   ❌ {filepath} - NOT FOUND")
             all_good = False
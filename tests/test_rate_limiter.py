@@ -0,0 +1,69 @@
+"""Tests for the client-side RateLimiter in llm_analyzer"""
+from types import SimpleNamespace
+
+import pytest
+
+llm_analyzer = pytest.importorskip("llm_analyzer")
+RateLimiter = llm_analyzer.RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock whose sleep() advances time instantly"""
+    state = SimpleNamespace(now=0.0, sleeps=[])
+    
+    def sleep(seconds):
+        state.sleeps.append(seconds)
+        state.now += seconds
+    
+    monkeypatch.setattr(llm_analyzer, "time", SimpleNamespace(monotonic=lambda: state.now, sleep=sleep))
+    return state
+
+
+@pytest.mark.parametrize("limits", [(0, None), (None, 0), (-5, None), ("0", "100")])
+def test_rejects_non_positive_limits(limits):
+    with pytest.raises(ValueError):
+        RateLimiter(*limits)
+
+
+def test_from_env_names_the_variables(monkeypatch):
+    monkeypatch.setattr(llm_analyzer, "MAX_REQUESTS_PER_MINUTE", "0")
+    with pytest.raises(ValueError, match="OPENAI_MAX_REQUESTS_PER_MINUTE"):
+        RateLimiter.from_env()
+
+
+def test_from_env_without_limits_is_none(monkeypatch):
+    monkeypatch.setattr(llm_analyzer, "MAX_REQUESTS_PER_MINUTE", None)
+    monkeypatch.setattr(llm_analyzer, "MAX_TOKENS_PER_MINUTE", None)
+    assert RateLimiter.from_env() is None
+
+
+def test_unlimited_never_waits(clock):
+    limiter = RateLimiter()
+    for _ in range(1000):
+        limiter.acquire(10_000)
+    assert clock.sleeps == []
+
+
+def test_request_limit_spaces_out_requests(clock):
+    limiter = RateLimiter(requests_per_minute="60")
+    for _ in range(60):
+        limiter.acquire(1)
+    assert clock.sleeps == []
+    
+    # The bucket is empty; one request refills every second
+    limiter.acquire(1)
+    assert clock.now == pytest.approx(1.0)
+
+
+def test_token_limit_waits_for_refill(clock):
+    limiter = RateLimiter(tokens_per_minute=600)
+    limiter.acquire(600)
+    limiter.acquire(300)
+    assert clock.now == pytest.approx(30.0)
+
+
+def test_oversized_request_is_capped_at_capacity(clock):
+    limiter = RateLimiter(tokens_per_minute=100)
+    limiter.acquire(1000)
+    assert clock.sleeps == []